@@ -53,6 +53,8 @@ def run_migrations_offline() -> None:
         url = url.replace("postgresql+asyncpg://", "postgresql://", 1)
     elif url.startswith("postgres+asyncpg://"):
         url = url.replace("postgres+asyncpg://", "postgresql://", 1)
+    elif url.startswith("sqlite+aiosqlite://"):
+        url = url.replace("sqlite+aiosqlite://", "sqlite://", 1)
 
     context.configure(
         url=url,
@@ -81,6 +83,8 @@ def run_migrations_online() -> None:
         url = url.replace("postgresql+asyncpg://", "postgresql://", 1)
     elif url.startswith("postgres+asyncpg://"):
         url = url.replace("postgres+asyncpg://", "postgresql://", 1)
+    elif url.startswith("sqlite+aiosqlite://"):
+        url = url.replace("sqlite+aiosqlite://", "sqlite://", 1)
 
     # Override the URL in the config
     config.set_main_option("sqlalchemy.url", url)
@@ -0,0 +1,35 @@
+"""Make document metadata keys unique per document
+
+Revision ID: 002_unique_metadata_key
+Revises: 001_add_document_images
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "002_unique_metadata_key"
+down_revision = "001_add_document_images"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep only the newest value for keys that were stored more than once
+    op.execute(
+        """
+        DELETE FROM document_metadata a
+        USING document_metadata b
+        WHERE a.document_id = b.document_id
+          AND a.key = b.key
+          AND (a.created_at, a.id) < (b.created_at, b.id)
+        """
+    )
+    op.create_unique_constraint(
+        "uq_document_metadata_key", "document_metadata", ["document_id", "key"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_document_metadata_key", "document_metadata", type_="unique")
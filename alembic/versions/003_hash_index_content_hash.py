@@ -0,0 +1,33 @@
+"""Use a hash index for document content hashes
+
+Revision ID: 003_hash_index_content_hash
+Revises: 002_unique_metadata_key
+Create Date: 2026-10-15 12:30:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "003_hash_index_content_hash"
+down_revision = "002_unique_metadata_key"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_documents_content_hash", table_name="documents")
+    op.create_index(
+        "ix_documents_content_hash",
+        "documents",
+        ["content_hash"],
+        unique=False,
+        postgresql_using="hash",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_content_hash", table_name="documents")
+    op.create_index(
+        "ix_documents_content_hash", "documents", ["content_hash"], unique=False
+    )
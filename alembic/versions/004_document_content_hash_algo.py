@@ -0,0 +1,35 @@
+"""Record the algorithm used for document content hashes
+
+Revision ID: 004_content_hash_algo
+Revises: 003_hash_index_content_hash
+Create Date: 2026-10-15 18:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "004_content_hash_algo"
+down_revision = "003_hash_index_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows predate configurable hashing, so they were all hashed
+    # with SHA-256; the server default fills them in
+    op.add_column(
+        "documents",
+        sa.Column(
+            "content_hash_algo",
+            sa.String(length=16),
+            nullable=False,
+            server_default="sha256",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("documents", "content_hash_algo")
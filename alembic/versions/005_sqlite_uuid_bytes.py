@@ -0,0 +1,70 @@
+"""Store SQLite UUID columns as 16 raw bytes
+
+Revision ID: 005_sqlite_uuid_bytes
+Revises: 004_content_hash_algo
+Create Date: 2026-10-15 23:30:00.000000
+
+"""
+
+import uuid
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "005_sqlite_uuid_bytes"
+down_revision = "004_content_hash_algo"
+branch_labels = None
+depends_on = None
+
+# UUID columns, which SQLite databases used to hold as 32-character hex text
+_UUID_COLUMNS = {
+    "documents": ("id",),
+    "document_images": ("id", "document_id"),
+    "document_metadata": ("id", "document_id"),
+    "processing_logs": ("id", "document_id"),
+}
+
+
+def _convert_uuids(to_bytes: bool) -> None:
+    bind = op.get_bind()
+    # PostgreSQL keeps its native uuid type
+    if bind.dialect.name != "sqlite":
+        return
+
+    # Parent and child keys change one statement at a time
+    op.execute("PRAGMA defer_foreign_keys = ON")
+    source_type = "text" if to_bytes else "blob"
+    for table, columns in _UUID_COLUMNS.items():
+        for column in columns:
+            values = bind.execute(
+                sa.text(
+                    f"SELECT DISTINCT {column} FROM {table} "
+                    f"WHERE typeof({column}) = '{source_type}'"
+                )
+            ).scalars()
+            params = [
+                {
+                    "old": value,
+                    "new": uuid.UUID(value).bytes
+                    if to_bytes
+                    else uuid.UUID(bytes=value).hex,
+                }
+                for value in values
+            ]
+            if params:
+                bind.execute(
+                    sa.text(
+                        f"UPDATE {table} SET {column} = :new WHERE {column} = :old"
+                    ),
+                    params,
+                )
+
+
+def upgrade() -> None:
+    _convert_uuids(to_bytes=True)
+
+
+def downgrade() -> None:
+    _convert_uuids(to_bytes=False)
@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import shutil
+import signal
 import sys
 import uuid
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import typer
 from loguru import logger
@@ -14,13 +17,21 @@ from rich.console import Console
 from rich.table import Table
 from rich.text import Text
 
+try:
+    import uvloop
+except ImportError:  # Optional "fast-loop" extra
+    uvloop = None
+
 from . import __version__
-from .config import get_settings
+from .config import get_settings, reload_settings
 from .database import get_db_manager
 from .image_storage import ImageStorageManager
 from .models import DocumentStatus, ImageType
 from .watcher import FileWatcher
 
+if TYPE_CHECKING:
+    from collections.abc import Coroutine
+
 # Create CLI app
 app = typer.Typer(
     name="doceat",
@@ -32,6 +43,12 @@ app = typer.Typer(
 console = Console()
 
 
+def _run[T](main: Coroutine[Any, Any, T]) -> T:
+    """Run a command's coroutine, on uvloop when it is installed."""
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    return asyncio.run(main, loop_factory=loop_factory)
+
+
 def setup_logging(verbose: bool = False) -> None:
     """Set up logging configuration."""
     settings = get_settings()
@@ -97,7 +114,7 @@ def init(
         finally:
             await db_manager.close()
 
-    asyncio.run(_init())
+    _run(_init())
 
 
 @app.command()
@@ -122,7 +139,10 @@ def watch(
 
         watcher = FileWatcher(settings)
 
-        try:
+        async def _start() -> None:
+            # Connect once per concurrent file before the first burst arrives
+            await get_db_manager().warm_pool(settings.max_concurrent_files)
+
             # Process existing files if requested
             if process_existing:
                 console.print("📂 Processing existing files...")
@@ -133,9 +153,57 @@ def watch(
 
             console.print("✅ File watcher started. Press Ctrl+C to stop.")
 
+        # Start up in a task so a stop request can interrupt the backfill
+        startup = asyncio.create_task(_start(), name="doceater.startup")
+
+        # Stop promptly on SIGINT/SIGTERM (not supported on Windows)
+        stop_requested = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def _request_stop() -> None:
+            stop_requested.set()
+            startup.cancel()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):
+                loop.add_signal_handler(sig, _request_stop)
+
+        # Reload settings on SIGHUP without restarting (POSIX only); pending
+        # reloads are referenced here so they are not garbage-collected
+        reload_tasks: set[asyncio.Task[None]] = set()
+
+        def _reload_done(task: asyncio.Task[None]) -> None:
+            reload_tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Failed to apply reloaded settings: {task.exception()}")
+
+        def _reload() -> None:
+            try:
+                new_settings = reload_settings()
+            except Exception as e:
+                logger.error(f"Failed to reload settings: {e}")
+                return
+            new_settings.watch_folder = settings.watch_folder
+            task = loop.create_task(watcher.update_settings(new_settings))
+            reload_tasks.add(task)
+            task.add_done_callback(_reload_done)
+            console.print("🔄 Settings reloaded")
+
+        if hasattr(signal, "SIGHUP"):
+            with contextlib.suppress(NotImplementedError):
+                loop.add_signal_handler(signal.SIGHUP, _reload)
+
+        try:
+            try:
+                await startup
+            except asyncio.CancelledError:
+                # Only a stop request ends startup quietly
+                if not stop_requested.is_set():
+                    raise
+
             # Keep running until interrupted
-            while True:
-                await asyncio.sleep(1)
+            await stop_requested.wait()
+            console.print("\n🛑 Stopping file watcher...")
 
         except KeyboardInterrupt:
             console.print("\n🛑 Stopping file watcher...")
@@ -146,7 +214,7 @@ def watch(
             await watcher.stop_watching()
             await get_db_manager().close()
 
-    asyncio.run(_watch())
+    _run(_watch())
 
 
 @app.command()
@@ -183,7 +251,7 @@ def ingest(
         finally:
             await get_db_manager().close()
 
-    asyncio.run(_ingest())
+    _run(_ingest())
 
 
 @app.command()
@@ -261,7 +329,7 @@ def list(
         finally:
             await db_manager.close()
 
-    asyncio.run(_list())
+    _run(_list())
 
 
 @app.command()
@@ -316,7 +384,7 @@ def show(
         finally:
             await db_manager.close()
 
-    asyncio.run(_show())
+    _run(_show())
 
 
 @app.command()
@@ -343,7 +411,7 @@ def status() -> None:
         finally:
             await db_manager.close()
 
-    asyncio.run(_status())
+    _run(_status())
 
 
 @app.command()
@@ -546,7 +614,7 @@ def images(
         finally:
             await db_manager.close()
 
-    asyncio.run(_images())
+    _run(_images())
 
 
 def main() -> None:
@@ -2,13 +2,30 @@
 
 from __future__ import annotations
 
+import fnmatch
+import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
-from pydantic import Field, field_validator
+from pydantic import Field, ValidationInfo, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+@lru_cache(maxsize=8)
+def _compile_exclude_patterns(patterns: tuple[str, ...]) -> re.Pattern[str]:
+    """Compile glob-style exclude patterns into one regular expression."""
+    if not patterns:
+        return re.compile(r"(?!)")
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns))
+
+
+@lru_cache(maxsize=8)
+def _lower_extensions(extensions: tuple[str, ...]) -> frozenset[str]:
+    """Lower-case file extensions into a set for suffix lookups."""
+    return frozenset(e.lower() for e in extensions)
+
+
 class Settings(BaseSettings):
     """Application settings with environment variable support."""
 
@@ -54,6 +71,11 @@ class Settings(BaseSettings):
         description="File patterns to exclude",
     )
 
+    content_hash_algo: str = Field(
+        default="sha256",
+        description="Hash algorithm used for content deduplication (sha256 or blake3)",
+    )
+
     # Docling settings
     docling_enrich_formula: bool = Field(
         default=True, description="Enable formula enrichment in Docling"
@@ -93,7 +115,18 @@ class Settings(BaseSettings):
     )
     processing_delay_seconds: float = Field(
         default=1.0,
-        description="Delay between processing files to avoid overwhelming system",
+        description="Time a file must stay unchanged before it is processed",
+    )
+    max_debounce_seconds: float = Field(
+        default=30.0,
+        description="Maximum time to hold back a file that keeps changing",
+    )
+    processing_rate_per_sec: float = Field(
+        default=0.0,
+        description="Maximum files started per second (0 = unlimited)",
+    )
+    processing_burst: int = Field(
+        default=10, description="Files that may start at once above the rate limit"
     )
 
     # Logging settings
@@ -148,6 +181,42 @@ class Settings(BaseSettings):
             raise ValueError(f"log_level must be one of: {valid_levels}")
         return v.upper()
 
+    @field_validator("content_hash_algo")
+    @classmethod
+    def validate_content_hash_algo(cls, v: str) -> str:
+        """Ensure content hash algorithm is supported."""
+        valid_algos = {"sha256", "blake3"}
+        if v.lower() not in valid_algos:
+            raise ValueError(f"content_hash_algo must be one of: {valid_algos}")
+        return v.lower()
+
+    @field_validator("max_debounce_seconds")
+    @classmethod
+    def validate_max_debounce(cls, v: float, info: ValidationInfo) -> float:
+        """Ensure the debounce cap is not shorter than the quiet window."""
+        delay = info.data.get("processing_delay_seconds")
+        if delay is not None and v < delay:
+            raise ValueError(
+                "max_debounce_seconds cannot be shorter than processing_delay_seconds"
+            )
+        return v
+
+    @field_validator("processing_rate_per_sec")
+    @classmethod
+    def validate_processing_rate(cls, v: float) -> float:
+        """Ensure processing rate is not negative."""
+        if v < 0:
+            raise ValueError("processing_rate_per_sec cannot be negative")
+        return v
+
+    @field_validator("processing_burst")
+    @classmethod
+    def validate_processing_burst(cls, v: int) -> int:
+        """Ensure processing burst allows at least one file."""
+        if v < 1:
+            raise ValueError("processing_burst must be at least 1")
+        return v
+
     @field_validator("images_base_path")
     @classmethod
     def validate_images_base_path(cls, v: str) -> str:
@@ -201,6 +270,16 @@ class Settings(BaseSettings):
         """Get max file size in bytes."""
         return self.max_file_size_mb * 1024 * 1024
 
+    @property
+    def excluded_re(self) -> re.Pattern[str]:
+        """Single compiled pattern matching any excluded file name."""
+        return _compile_exclude_patterns(tuple(self.exclude_patterns))
+
+    @property
+    def extensions_set(self) -> frozenset[str]:
+        """Supported file extensions, lower-cased for suffix lookups."""
+        return _lower_extensions(tuple(self.supported_extensions))
+
     def get_database_components(self) -> dict[str, Any]:
         """Parse database URL into components."""
         from urllib.parse import urlparse
@@ -5,16 +5,19 @@ from __future__ import annotations
 import uuid
 from collections.abc import AsyncGenerator, Sequence
 from contextlib import asynccontextmanager
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from loguru import logger
-from sqlalchemy import func, select, update
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import QueuePool
 
 from .config import Settings, get_settings
 from .models import (
@@ -28,6 +31,9 @@ from .models import (
     ProcessingLog,
 )
 
+if TYPE_CHECKING:
+    from .image_storage import StoredImage
+
 
 class DatabaseManager:
     """Manages database connections and operations."""
@@ -36,10 +42,34 @@ class DatabaseManager:
         self.settings = settings or get_settings()
         self._engine: AsyncEngine | None = None
         self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        # Set when the manager runs on a connection owned by the caller
+        self._connection: AsyncConnection | None = None
+
+    @classmethod
+    def from_connection(
+        cls, connection: AsyncConnection, settings: Settings | None = None
+    ) -> DatabaseManager:
+        """Create a manager that runs all work on an existing connection.
+
+        Sessions and DDL join the connection's transaction through SAVEPOINTs,
+        so the caller keeps control of the outer transaction and of closing
+        the connection.
+        """
+        manager = cls(settings)
+        manager._connection = connection
+        manager._session_factory = async_sessionmaker(
+            bind=connection,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        return manager
 
     @property
     def engine(self) -> AsyncEngine:
         """Get or create the database engine."""
+        if self._connection is not None:
+            return self._connection.engine
         if self._engine is None:
             db_url = self.settings.database_url
 
@@ -91,20 +121,48 @@ class DatabaseManager:
                 await session.rollback()
                 raise
 
+    @asynccontextmanager
+    async def _begin(self) -> AsyncGenerator[AsyncConnection]:
+        """Open a transaction on the bound connection or a pooled one."""
+        if self._connection is not None:
+            async with self._connection.begin_nested():
+                yield self._connection
+        else:
+            async with self.engine.begin() as conn:
+                yield conn
+
     async def create_tables(self) -> None:
         """Create all database tables."""
-        async with self.engine.begin() as conn:
+        async with self._begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
 
     async def drop_tables(self) -> None:
         """Drop all database tables."""
-        async with self.engine.begin() as conn:
+        async with self._begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
         logger.info("Database tables dropped successfully")
 
+    async def warm_pool(self, connections: int) -> None:
+        """Open pooled connections up front so the first queries skip connecting.
+
+        The count is capped at the connections the pool keeps once they are
+        returned; warming more would block on an exhausted pool.
+        """
+        pool = self.engine.pool
+        limit = pool.size() if isinstance(pool, QueuePool) else 1
+        connections = min(connections, limit)
+
+        opened = [await self.engine.connect() for _ in range(connections)]
+        for conn in opened:
+            await conn.close()
+        logger.debug(f"Warmed database pool with {connections} connections")
+
     async def close(self) -> None:
-        """Close the database connection."""
+        """Close the database connection.
+
+        A manager created from an existing connection leaves it open.
+        """
         if self._engine:
             await self._engine.dispose()
             self._engine = None
@@ -119,12 +177,16 @@ class DatabaseManager:
         content_hash: str,
         file_size: int,
         mime_type: str | None = None,
+        document_id: uuid.UUID | None = None,
+        content_hash_algo: str = "sha256",
     ) -> Document:
         """Create a new document record."""
         document = Document(
+            id=document_id or uuid.uuid4(),
             file_path=file_path,
             filename=filename,
             content_hash=content_hash,
+            content_hash_algo=content_hash_algo,
             file_size=file_size,
             mime_type=mime_type,
         )
@@ -137,6 +199,140 @@ class DatabaseManager:
         logger.info(f"Created document record: {document.id} ({filename})")
         return document
 
+    async def create_documents_bulk(
+        self, rows: Sequence[dict[str, Any]]
+    ) -> list[Document]:
+        """Create several document records with a single INSERT.
+
+        Each row holds Document column values; omitted columns get their
+        defaults.
+        """
+        if not rows:
+            return []
+
+        async with self.get_session() as session:
+            result = await session.scalars(
+                insert(Document).returning(Document, sort_by_parameter_order=True),
+                list(rows),
+            )
+            documents = list(result.all())
+
+        logger.info(f"Created {len(documents)} document records")
+        return documents
+
+    async def create_completed_document(
+        self,
+        document_id: uuid.UUID,
+        file_path: str,
+        filename: str,
+        content_hash: str,
+        file_size: int,
+        mime_type: str | None,
+        markdown_content: str,
+        metadata: dict[str, str] | None = None,
+        log_details: dict[str, Any] | None = None,
+        images: Sequence[StoredImage] = (),
+        content_hash_algo: str = "sha256",
+    ) -> uuid.UUID:
+        """Create a fully processed document in a single transaction.
+
+        Inserts the document with its final content and status together with
+        its metadata, image records and success log entry, so a successfully
+        processed file costs one round-trip instead of one per step.
+        """
+        session_objects: list[Base] = [
+            Document(
+                id=document_id,
+                file_path=file_path,
+                filename=filename,
+                content_hash=content_hash,
+                content_hash_algo=content_hash_algo,
+                file_size=file_size,
+                mime_type=mime_type,
+                markdown_content=markdown_content,
+                status=DocumentStatus.COMPLETED,
+                processed_at=func.now(),
+            )
+        ]
+        session_objects.extend(
+            DocumentMetadata(document_id=document_id, key=key, value=value)
+            for key, value in (metadata or {}).items()
+        )
+        session_objects.extend(
+            DocumentImage(
+                document_id=document_id,
+                image_path=str(image.path),
+                filename=image.filename,
+                image_type=image.image_type,
+                image_index=image.image_index,
+                file_size=image.file_size,
+                width=image.width,
+                height=image.height,
+                format=image.format,
+                extraction_method="docling",
+            )
+            for image in images
+        )
+        message = f"Successfully processed file: {filename}"
+        session_objects.append(
+            ProcessingLog(
+                document_id=document_id,
+                level=LogLevel.INFO,
+                message=message,
+                details=log_details,
+            )
+        )
+
+        async with self.get_session() as session:
+            session.add_all(session_objects)
+
+        logger.debug(f"[{document_id}] {message}")
+        return document_id
+
+    async def create_failed_document(
+        self,
+        document_id: uuid.UUID,
+        file_path: str,
+        filename: str,
+        content_hash: str,
+        file_size: int,
+        mime_type: str | None,
+        markdown_content: str | None,
+        error_details: dict[str, Any] | None = None,
+        content_hash_algo: str = "sha256",
+    ) -> uuid.UUID:
+        """Create a document that failed processing in a single transaction.
+
+        Inserts the failed document with any partial content together with
+        its error log entry.
+        """
+        message = f"Failed to process file: {filename}"
+        async with self.get_session() as session:
+            session.add_all(
+                [
+                    Document(
+                        id=document_id,
+                        file_path=file_path,
+                        filename=filename,
+                        content_hash=content_hash,
+                        content_hash_algo=content_hash_algo,
+                        file_size=file_size,
+                        mime_type=mime_type,
+                        markdown_content=markdown_content,
+                        status=DocumentStatus.FAILED,
+                    ),
+                    ProcessingLog(
+                        document_id=document_id,
+                        level=LogLevel.ERROR,
+                        message=message,
+                        details=error_details,
+                    ),
+                ]
+            )
+
+        logger.error(f"[{document_id}] {message}")
+        return document_id
+
     async def get_document_by_id(self, document_id: uuid.UUID) -> Document | None:
         """Get a document by ID."""
         async with self.get_session() as session:
@@ -153,13 +349,32 @@ class DatabaseManager:
             )
             return result.scalar_one_or_none()
 
-    async def get_document_by_hash(self, content_hash: str) -> Document | None:
-        """Get a document by content hash."""
+    async def document_exists_by_path(self, file_path: str) -> bool:
+        """Check whether a document exists for a file path.
+
+        Cheaper than get_document_by_path as it only probes the unique
+        file_path index instead of loading the full row.
+        """
         async with self.get_session() as session:
             result = await session.execute(
-                select(Document).where(Document.content_hash == content_hash)
+                select(Document.id).where(Document.file_path == file_path).limit(1)
             )
-            return result.scalar_one_or_none()
+            return result.scalar_one_or_none() is not None
+
+    async def get_document_by_hash(
+        self, content_hash: str, content_hash_algo: str = "sha256"
+    ) -> Document | None:
+        """Get a document by content hash computed with the given algorithm."""
+        async with self.get_session() as session:
+            result = await session.execute(
+                select(Document).where(
+                    Document.content_hash == content_hash,
+                    Document.content_hash_algo == content_hash_algo,
+                )
+            )
+            # content_hash is not unique; copies stored by concurrent runs
+            # or older releases may share it
+            return result.scalars().first()
 
     async def update_document_content(
         self,
@@ -181,7 +396,7 @@ class DatabaseManager:
                 )
             )
 
-        logger.info(f"Updated document content: {document_id}")
+        logger.debug(f"Updated document content: {document_id}")
 
     async def update_document_status(
         self,
@@ -219,15 +434,23 @@ class DatabaseManager:
         document_id: uuid.UUID,
         metadata: dict[str, str],
     ) -> None:
-        """Add metadata to a document."""
+        """Add metadata to a document, replacing values for existing keys."""
+        if not metadata:
+            return
+
+        rows = [
+            {"document_id": document_id, "key": k, "value": v}
+            for k, v in metadata.items()
+        ]
         async with self.get_session() as session:
-            for key, value in metadata.items():
-                metadata_obj = DocumentMetadata(
-                    document_id=document_id,
-                    key=key,
-                    value=value,
-                )
-                session.add(metadata_obj)
+            dialect = session.get_bind().dialect.name
+            upsert = (postgresql if dialect == "postgresql" else sqlite).insert
+            stmt = upsert(DocumentMetadata).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["document_id", "key"],
+                set_={"value": stmt.excluded.value},
+            )
+            await session.execute(stmt)
 
         logger.debug(f"Added metadata to document: {document_id}")
 
@@ -342,19 +565,32 @@ class DatabaseManager:
         details: dict[str, Any] | None = None,
     ) -> None:
         """Log a processing event."""
-        log_entry = ProcessingLog(
-            document_id=document_id,
-            level=level,
-            message=message,
-            details=details,
+        await self.log_processing_batch(
+            [
+                {
+                    "level": level,
+                    "message": message,
+                    "document_id": document_id,
+                    "details": details,
+                }
+            ]
         )
 
+    async def log_processing_batch(self, entries: Sequence[dict[str, Any]]) -> None:
+        """Log several processing events in one transaction.
+
+        Each entry takes the keyword arguments of log_processing.
+        """
+        if not entries:
+            return
+
         async with self.get_session() as session:
-            session.add(log_entry)
+            session.add_all([ProcessingLog(**entry) for entry in entries])
 
         # Also log to application logger
-        log_func = getattr(logger, level.value.lower())
-        log_func(f"[{document_id or 'SYSTEM'}] {message}")
+        for entry in entries:
+            log_func = getattr(logger, entry["level"].value.lower())
+            log_func(f"[{entry.get('document_id') or 'SYSTEM'}] {entry['message']}")
 
     async def get_processing_logs(
         self,
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import os
+import threading
 from pathlib import Path
 from typing import Any
 
@@ -12,6 +13,22 @@ from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling_core.types.doc import ImageRefMode, PictureItem, TableItem
 from loguru import logger
 
+# Where Docling model weights are read from unless overridden
+DEFAULT_ARTIFACTS_PATH = "~/.cache/docling/models"
+
+
+def resolve_artifacts_path(artifacts_path: str | None = None) -> str:
+    """Resolve the Docling models directory.
+
+    Uses the given path, then ``DOCLING_ARTIFACTS_PATH``, then the default cache.
+    """
+    path = (
+        artifacts_path
+        or os.environ.get("DOCLING_ARTIFACTS_PATH")
+        or DEFAULT_ARTIFACTS_PATH
+    )
+    return os.path.expanduser(path)
+
 
 class DoclingWrapper:
     """Wrapper for Docling with enhanced configuration including formula enrichment and image extraction."""
@@ -21,6 +38,7 @@ class DoclingWrapper:
         enable_formula_enrichment: bool = True,
         enable_image_extraction: bool = True,
         images_scale: float = 2.0,
+        artifacts_path: str | None = None,
     ) -> None:
         """Initialize the Docling wrapper.
 
@@ -28,43 +46,57 @@ class DoclingWrapper:
             enable_formula_enrichment: Whether to enable formula enrichment (--enrich_formula)
             enable_image_extraction: Whether to extract images from documents
             images_scale: Scale factor for extracted images (1.0 = 72 DPI, 2.0 = 144 DPI)
+            artifacts_path: Directory holding the Docling models
+                (default: ``DOCLING_ARTIFACTS_PATH`` or ~/.cache/docling/models)
         """
         self.enable_formula_enrichment = enable_formula_enrichment
         self.enable_image_extraction = enable_image_extraction
         self.images_scale = images_scale
+        self.artifacts_path = resolve_artifacts_path(artifacts_path)
         self._converter: DocumentConverter | None = None
+        # Conversions run in worker threads; build the converter only once
+        self._converter_lock = threading.Lock()
+        # Docling does not document DocumentConverter.convert() as thread-safe,
+        # so calls on the shared converter run one at a time
+        self._convert_lock = threading.Lock()
 
     @property
     def converter(self) -> DocumentConverter:
         """Get or create the Docling converter with enhanced local model configuration."""
-        if self._converter is None:
-            # Configure local models path
-            artifacts_path = os.path.expanduser("~/.cache/docling/models")
-
-            # Configure PDF pipeline options with local models
-            pipeline_options = PdfPipelineOptions(
-                do_ocr=False,  # Disable OCR for now (can be enabled if needed)
-                do_table_structure=True,  # Enable table structure detection
-                do_formula_enrichment=self.enable_formula_enrichment,  # Formula enrichment
-                artifacts_path=artifacts_path,  # Use local models
-                # Image extraction options
-                images_scale=self.images_scale,  # Scale for extracted images
-                generate_page_images=False,  # Don't extract full page images
-                generate_picture_images=self.enable_image_extraction,  # Extract only figure images
-            )
-
-            # Create converter with enhanced configuration
-            self._converter = DocumentConverter(
-                format_options={
-                    InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-                }
-            )
-
-            logger.info(
-                f"Initialized Docling converter with local models from {artifacts_path}, "
-                f"formula enrichment: {self.enable_formula_enrichment}, "
-                f"image extraction: {self.enable_image_extraction} (scale: {self.images_scale}x)"
-            )
+        if self._converter is not None:
+            return self._converter
+
+        with self._converter_lock:
+            if self._converter is None:
+                # Configure local models path
+                artifacts_path = self.artifacts_path
+
+                # Configure PDF pipeline options with local models
+                pipeline_options = PdfPipelineOptions(
+                    do_ocr=False,  # Disable OCR for now (can be enabled if needed)
+                    do_table_structure=True,  # Enable table structure detection
+                    do_formula_enrichment=self.enable_formula_enrichment,  # Formula enrichment
+                    artifacts_path=artifacts_path,  # Use local models
+                    # Image extraction options
+                    images_scale=self.images_scale,  # Scale for extracted images
+                    generate_page_images=False,  # Don't extract full page images
+                    generate_picture_images=self.enable_image_extraction,  # Extract only figure images
+                )
+
+                # Create converter with enhanced configuration
+                self._converter = DocumentConverter(
+                    format_options={
+                        InputFormat.PDF: PdfFormatOption(
+                            pipeline_options=pipeline_options
+                        )
+                    }
+                )
+
+                logger.info(
+                    f"Initialized Docling converter with local models from {artifacts_path}, "
+                    f"formula enrichment: {self.enable_formula_enrichment}, "
+                    f"image extraction: {self.enable_image_extraction} (scale: {self.images_scale}x)"
+                )
 
         return self._converter
 
@@ -78,9 +110,11 @@ class DoclingWrapper:
             Docling conversion result
         """
         try:
-            logger.info(f"Converting document with Docling: {file_path}")
-            result = self.converter.convert(str(file_path))
-            logger.info(f"Successfully converted document: {file_path}")
+            logger.debug(f"Converting document with Docling: {file_path}")
+            converter = self.converter
+            with self._convert_lock:
+                result = converter.convert(str(file_path))
+            logger.debug(f"Successfully converted document: {file_path}")
             return result
         except Exception as e:
             logger.error(f"Failed to convert document {file_path}: {e}")
@@ -142,7 +176,7 @@ class DoclingWrapper:
                 image_mode=ImageRefMode.REFERENCED
             )
 
-        logger.info(f"Extracted {len(extracted_images)} images to {output_dir}")
+        logger.debug(f"Extracted {len(extracted_images)} images to {output_dir}")
         return markdown_content, extracted_images
 
     def convert_to_markdown_with_storage(
@@ -194,7 +228,7 @@ class DoclingWrapper:
                 image_mode=ImageRefMode.REFERENCED
             )
 
-        logger.info(
+        logger.debug(
             f"Extracted {len(extracted_images)} images to temporary directory {temp_dir}"
         )
         return markdown_content, extracted_images
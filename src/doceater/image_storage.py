@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import errno
+import json
+import os
 import shutil
+import threading
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, BinaryIO
 
 from loguru import logger
 from PIL import Image
@@ -14,6 +18,42 @@ from PIL import Image
 from .config import Settings, get_settings
 from .models import ImageType
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+# Filename keywords for image types, checked in priority order
+_IMAGE_TYPE_KEYWORDS: tuple[tuple[str, ImageType], ...] = (
+    ("table", ImageType.TABLE),
+    ("picture", ImageType.PICTURE),
+    ("formula", ImageType.FORMULA),
+    ("equation", ImageType.FORMULA),
+    ("chart", ImageType.CHART),
+    ("diagram", ImageType.DIAGRAM),
+    ("page", ImageType.PAGE),
+)
+_IMAGE_TYPE_BY_KEYWORD = dict(_IMAGE_TYPE_KEYWORDS)
+
+# Running totals kept next to the stored images
+_STATS_FILENAME = ".stats.json"
+
+# Scratch space for in-progress extractions, kept apart from stored images
+_SCRATCH_DIRNAME = ".scratch"
+
+
+def _is_storage_dirname(name: str) -> bool:
+    """Report whether a top-level directory holds stored images.
+
+    Stored images live below a year directory, or directly below their
+    document ID when images are not organized by date.
+    """
+    if name.isdigit():
+        return True
+    try:
+        uuid.UUID(name)
+    except ValueError:
+        return False
+    return True
+
 
 class StoredImage:
     """Represents a stored image with metadata."""
@@ -47,16 +87,34 @@ class StoredImage:
 class ImageStorageManager:
     """Manages image storage with file organization and metadata extraction."""
 
-    def __init__(self, settings: Settings | None = None) -> None:
+    def __init__(
+        self,
+        settings: Settings | None = None,
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
         self.settings = settings or get_settings()
+        # Source of the current time for date-based storage paths
+        self._clock = clock
         self.base_path = Path(self.settings.images_base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
+        # Running file and byte totals, loaded once and updated in memory
+        self._stats_lock = threading.Lock()
+        self._stats = self._load_stats()
+
+    @property
+    def scratch_path(self) -> Path:
+        """Directory for temporary extraction output.
+
+        It shares the filesystem with stored images, so storing an extracted
+        image is a rename, but is not counted in the storage statistics.
+        """
+        return self.base_path / _SCRATCH_DIRNAME
 
     def _get_storage_path(self, document_id: uuid.UUID) -> Path:
         """Get the storage path for a document's images."""
         if self.settings.images_organize_by_date:
             # Date-based organization: YYYY/MM/DD/document_id/
-            now = datetime.now()
+            now = self._clock()
             date_path = (
                 self.base_path
                 / f"{now.year:04d}"
@@ -71,10 +129,10 @@ class ImageStorageManager:
         storage_path.mkdir(parents=True, exist_ok=True)
         return storage_path
 
-    def _extract_image_metadata(self, image_path: Path) -> dict[str, Any]:
-        """Extract metadata from an image file."""
+    def _extract_image_metadata(self, image: Path | BinaryIO) -> dict[str, Any]:
+        """Extract metadata from an image file path or binary stream."""
         try:
-            with Image.open(image_path) as img:
+            with Image.open(image) as img:
                 return {
                     "width": img.width,
                     "height": img.height,
@@ -82,12 +140,11 @@ class ImageStorageManager:
                     "mode": img.mode,
                 }
         except Exception as e:
-            logger.warning(f"Failed to extract metadata from {image_path}: {e}")
+            logger.warning(f"Failed to extract metadata from {image}: {e}")
             return {}
 
-    def _validate_image_size(self, file_path: Path) -> bool:
+    def _validate_image_size(self, file_path: Path, file_size: int) -> bool:
         """Validate that image size is within limits."""
-        file_size = file_path.stat().st_size
         max_size = self.settings.images_max_size_bytes
 
         if file_size > max_size:
@@ -98,30 +155,93 @@ class ImageStorageManager:
 
         return True
 
+    def _move_image(self, source_path: Path, target_path: Path) -> None:
+        """Move an image into storage, renaming in place when possible."""
+        try:
+            os.rename(source_path, target_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Source and storage are on different filesystems
+            shutil.copy2(source_path, target_path)
+            source_path.unlink()
+
+    def _iter_stored_files(self) -> Iterator[Path]:
+        """Yield the files under the date or document directories."""
+        with os.scandir(self.base_path) as entries:
+            roots = [
+                entry.path
+                for entry in entries
+                if entry.is_dir(follow_symlinks=False)
+                and _is_storage_dirname(entry.name)
+            ]
+        for root in roots:
+            for file_path in Path(root).rglob("*"):
+                if file_path.is_file():
+                    yield file_path
+
+    def _load_stats(self) -> dict[str, int]:
+        """Load the stored totals, walking the image tree if they are missing."""
+        try:
+            stats = json.loads((self.base_path / _STATS_FILENAME).read_text())
+            return {"files": int(stats["files"]), "bytes": int(stats["bytes"])}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        stats = {"files": 0, "bytes": 0}
+        for file_path in self._iter_stored_files():
+            stats["files"] += 1
+            stats["bytes"] += file_path.stat().st_size
+        self._save_stats(stats)
+        return stats
+
+    def _save_stats(self, stats: dict[str, int]) -> None:
+        """Persist the totals atomically."""
+        stats_path = self.base_path / _STATS_FILENAME
+        # Per-process temporary file, so concurrent writers never share one
+        tmp_path = stats_path.with_name(f"{_STATS_FILENAME}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(stats))
+            os.replace(tmp_path, stats_path)
+        except OSError as e:
+            logger.warning(f"Failed to save storage stats: {e}")
+
+    def _adjust_stats(self, files: int, size: int) -> None:
+        """Apply a change to the file and byte totals and persist them.
+
+        The totals are only read when the manager is created, so another
+        process writing to the same image store overwrites them; delete
+        the stats file to rebuild it from the image tree.
+        """
+        with self._stats_lock:
+            self._stats["files"] = max(0, self._stats["files"] + files)
+            self._stats["bytes"] = max(0, self._stats["bytes"] + size)
+            self._save_stats(self._stats)
+
     def _determine_image_type(self, filename: str) -> ImageType:
         """Determine image type from filename."""
         filename_lower = filename.lower()
 
-        if "table" in filename_lower:
-            return ImageType.TABLE
-        elif "picture" in filename_lower:
-            return ImageType.PICTURE
-        elif "formula" in filename_lower or "equation" in filename_lower:
-            return ImageType.FORMULA
-        elif "chart" in filename_lower:
-            return ImageType.CHART
-        elif "diagram" in filename_lower:
-            return ImageType.DIAGRAM
-        elif "page" in filename_lower:
-            return ImageType.PAGE
-        else:
-            # Default to picture for unknown types
-            return ImageType.PICTURE
+        # Docling names images "<stem>-<type>-<n>.png"; look that token up first
+        parts = filename_lower.rsplit("-", 2)
+        if len(parts) == 3 and parts[1] in _IMAGE_TYPE_BY_KEYWORD:
+            return _IMAGE_TYPE_BY_KEYWORD[parts[1]]
+
+        for keyword, image_type in _IMAGE_TYPE_KEYWORDS:
+            if keyword in filename_lower:
+                return image_type
+
+        # Default to picture for unknown types
+        return ImageType.PICTURE
 
     async def store_images(
         self, document_id: uuid.UUID, image_paths: list[Path]
     ) -> list[StoredImage]:
-        """Store images for a document and return stored image information."""
+        """Store images for a document and return stored image information.
+
+        Source images are moved into storage, so callers should pass
+        temporary extraction output rather than files they want to keep.
+        """
         if not self.settings.images_enabled:
             logger.debug("Image storage is disabled")
             return []
@@ -133,14 +253,15 @@ class ImageStorageManager:
         storage_path = self._get_storage_path(document_id)
         stored_images = []
 
-        logger.info(
+        logger.debug(
             f"Storing {len(image_paths)} images for document {document_id} in {storage_path}"
         )
 
         for index, source_path in enumerate(image_paths, 1):
             try:
-                # Validate image size
-                if not self._validate_image_size(source_path):
+                # Validate image size; moving the file does not change it
+                file_size = source_path.stat().st_size
+                if not self._validate_image_size(source_path, file_size):
                     continue
 
                 # Determine image type and create target filename
@@ -148,12 +269,11 @@ class ImageStorageManager:
                 target_filename = source_path.name
                 target_path = storage_path / target_filename
 
-                # Copy the image file
-                shutil.copy2(source_path, target_path)
+                # Move the image file into storage
+                self._move_image(source_path, target_path)
 
                 # Extract metadata
                 metadata = self._extract_image_metadata(target_path)
-                file_size = target_path.stat().st_size
 
                 # Create relative path from base directory
                 relative_path = target_path.relative_to(self.base_path)
@@ -185,7 +305,13 @@ class ImageStorageManager:
                         pass
                 continue
 
-        logger.info(
+        if stored_images:
+            self._adjust_stats(
+                len(stored_images),
+                sum(image.file_size for image in stored_images),
+            )
+
+        logger.debug(
             f"Successfully stored {len(stored_images)} images for document {document_id}"
         )
         return stored_images
@@ -202,31 +328,36 @@ class ImageStorageManager:
             return 0
 
         deleted_count = 0
+        deleted_bytes = 0
         try:
-            for image_file in storage_path.iterdir():
-                if image_file.is_file():
-                    image_file.unlink()
-                    deleted_count += 1
+            with os.scandir(storage_path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        file_size = entry.stat().st_size
+                        os.unlink(entry.path)
+                        deleted_count += 1
+                        deleted_bytes += file_size
 
             # Remove the directory if empty
-            if not any(storage_path.iterdir()):
+            with os.scandir(storage_path) as entries:
+                is_empty = next(entries, None) is None
+            if is_empty:
                 storage_path.rmdir()
 
             logger.info(f"Cleaned up {deleted_count} images for document {document_id}")
         except Exception as e:
             logger.error(f"Failed to cleanup images for document {document_id}: {e}")
 
+        if deleted_count:
+            self._adjust_stats(-deleted_count, -deleted_bytes)
+
         return deleted_count
 
     def get_storage_stats(self) -> dict[str, Any]:
         """Get storage statistics."""
-        total_size = 0
-        total_files = 0
-
-        for file_path in self.base_path.rglob("*"):
-            if file_path.is_file():
-                total_files += 1
-                total_size += file_path.stat().st_size
+        with self._stats_lock:
+            total_files = self._stats["files"]
+            total_size = self._stats["bytes"]
 
         return {
             "base_path": str(self.base_path),
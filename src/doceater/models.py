@@ -5,12 +5,54 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 from enum import Enum
-from typing import Any
-
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, String, Text, func
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import (
+    BINARY,
+    JSON,
+    BigInteger,
+    DateTime,
+    Dialect,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    TypeDecorator,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+if TYPE_CHECKING:
+    from sqlalchemy.types import TypeEngine
+
+
+class UUIDBinary(TypeDecorator[uuid.UUID]):
+    """UUID stored natively on PostgreSQL and as 16 raw bytes elsewhere."""
+
+    impl = BINARY(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect: Dialect) -> TypeEngine[Any]:
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(UUID(as_uuid=True))
+        return dialect.type_descriptor(BINARY(16))
+
+    def process_bind_param(
+        self, value: uuid.UUID | None, dialect: Dialect
+    ) -> uuid.UUID | bytes | None:
+        if value is None or dialect.name == "postgresql":
+            return value
+        return value.bytes
+
+    def process_result_value(
+        self, value: uuid.UUID | bytes | None, dialect: Dialect
+    ) -> uuid.UUID | None:
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(bytes=value)
+
 
 class Base(DeclarativeBase):
     """Base class for all database models."""
@@ -50,10 +92,14 @@ class Document(Base):
     """Document table for storing file information and content."""
 
     __tablename__ = "documents"
+    __table_args__ = (
+        # Hash lookups are equality-only; other dialects get a regular index
+        Index("ix_documents_content_hash", "content_hash", postgresql_using="hash"),
+    )
 
     # Primary key
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+        UUIDBinary(), primary_key=True, default=uuid.uuid4, index=True
     )
 
     # File information
@@ -61,7 +107,10 @@ class Document(Base):
         Text, unique=True, nullable=False, index=True
     )
     filename: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
-    content_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    content_hash_algo: Mapped[str] = mapped_column(
+        String(16), nullable=False, default="sha256", server_default="sha256"
+    )
     file_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
     mime_type: Mapped[str | None] = mapped_column(String(100), nullable=True)
 
@@ -100,12 +149,12 @@ class DocumentImage(Base):
 
     # Primary key
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+        UUIDBinary(), primary_key=True, default=uuid.uuid4, index=True
     )
 
     # Foreign key to document
     document_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True),
+        UUIDBinary(),
         ForeignKey("documents.id", ondelete="CASCADE"),
         nullable=False,
         index=True,
@@ -169,15 +218,18 @@ class DocumentMetadata(Base):
     """Flexible metadata storage for documents."""
 
     __tablename__ = "document_metadata"
+    __table_args__ = (
+        UniqueConstraint("document_id", "key", name="uq_document_metadata_key"),
+    )
 
     # Primary key
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUIDBinary(), primary_key=True, default=uuid.uuid4
     )
 
     # Foreign key to document
     document_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), nullable=False, index=True
+        UUIDBinary(), nullable=False, index=True
     )
 
     # Metadata key-value
@@ -200,12 +252,12 @@ class ProcessingLog(Base):
 
     # Primary key
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUIDBinary(), primary_key=True, default=uuid.uuid4
     )
 
     # Foreign key to document (optional for system-wide logs)
     document_id: Mapped[uuid.UUID | None] = mapped_column(
-        UUID(as_uuid=True), nullable=True, index=True
+        UUIDBinary(), nullable=True, index=True
     )
 
     # Log details
@@ -2,18 +2,143 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import hashlib
 import mimetypes
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
-import aiofiles
 from loguru import logger
+from sqlalchemy.exc import IntegrityError
+
+try:
+    import blake3
+except ImportError:  # Optional "fast-hash" extra
+    blake3 = None
 
 from .config import Settings, get_settings
 from .database import DatabaseManager, get_db_manager
 from .docling_wrapper import DoclingWrapper
-from .image_storage import ImageStorageManager
-from .models import DocumentStatus, LogLevel
+from .image_storage import ImageStorageManager, StoredImage
+
+# Load the MIME type database once at import rather than on first lookup
+mimetypes.init()
+
+# Placeholder content stored for documents that failed to process
+_FAILED_TEMPLATE = (
+    "# {name}\n\n"
+    "*File processing failed: {error}*\n\n"
+    "File information:\n"
+    "- Size: {size} bytes\n"
+    "- Type: {mime}\n"
+)
+
+
+@functools.lru_cache(maxsize=512)
+def _mime_for_suffix(suffix: str) -> str | None:
+    """Look up the MIME type for a lower-cased file suffix."""
+    return mimetypes.types_map.get(suffix) or mimetypes.guess_type("x" + suffix)[0]
+
+
+# Temporary image roots are named after the process that owns them
+_TEMP_ROOT_PREFIX = "doceater_images_"
+
+
+def _process_alive(pid: int) -> bool:
+    """Report whether a process is running; assume so when it cannot be probed."""
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill terminates the process on Windows instead of probing it
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, but owned by another user
+        return True
+    return True
+
+
+def _sweep_stale_temp_roots(scratch_path: Path) -> None:
+    """Remove temporary image roots left behind by processes that have exited."""
+    for root in scratch_path.glob(f"{_TEMP_ROOT_PREFIX}*"):
+        pid = root.name.removeprefix(_TEMP_ROOT_PREFIX).partition("_")[0]
+        if pid.isdigit() and not _process_alive(int(pid)):
+            shutil.rmtree(root, ignore_errors=True)
+            logger.info(f"Removed stale temporary image directory: {root}")
+
+
+# Files up to this size are hashed with buffered reads instead of mmap
+_MMAP_THRESHOLD = 1 << 20
+
+
+def _new_sha256() -> Any:
+    """Create a SHA-256 hasher for content deduplication."""
+    # The hash only serves deduplication, so opt out of security-mode checks
+    return hashlib.new("sha256", usedforsecurity=False)
+
+
+def _sha256_file_digest(file_path: Path) -> str:
+    """Hash a file with SHA-256, memory-mapping large files to avoid copies."""
+    with file_path.open("rb", buffering=0) as f:
+        fd = f.fileno()
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        # Small files are not worth the mmap setup, and files beyond the
+        # address space (32-bit builds) must be streamed; file_digest reads
+        # in C with a large buffer
+        if not _MMAP_THRESHOLD < os.fstat(fd).st_size <= sys.maxsize:
+            return hashlib.file_digest(f, _new_sha256).hexdigest()
+
+        hash_sha256 = _new_sha256()
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            hash_sha256.update(mm)
+
+    return hash_sha256.hexdigest()
+
+
+def _blake3_file_digest(file_path: Path) -> str:
+    """Hash a file with BLAKE3 using memory-mapped, multi-threaded hashing."""
+    hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    hasher.update_mmap(file_path)
+    return hasher.hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class FileInfo:
+    """File attributes gathered with a single stat() per processing run."""
+
+    size: int
+    ctime: float
+    mtime: float
+    suffix: str
+    mime_type: str | None
+
+    def to_metadata(self) -> dict[str, str]:
+        """Build the document metadata entries for this file."""
+        metadata = {
+            "file_extension": self.suffix,
+            "file_size_bytes": str(self.size),
+            "created_time": str(self.ctime),
+            "modified_time": str(self.mtime),
+        }
+
+        # Add MIME type if available
+        if self.mime_type:
+            metadata["mime_type"] = self.mime_type
+
+        return metadata
 
 
 class DocumentProcessor:
@@ -25,12 +150,30 @@ class DocumentProcessor:
         db_manager: DatabaseManager | None = None,
         enable_formula_enrichment: bool = True,
         image_storage: ImageStorageManager | None = None,
+        docling_wrapper: DoclingWrapper | None = None,
     ) -> None:
         self.settings = settings or get_settings()
         self.db_manager = db_manager or get_db_manager()
         self.image_storage = image_storage or ImageStorageManager(self.settings)
-        self._docling_wrapper: DoclingWrapper | None = None
+        # A shared wrapper lets several processors reuse one loaded converter
+        self._docling_wrapper: DoclingWrapper | None = docling_wrapper
+        self._temp_images_root: Path | None = None
+        # (algorithm, hash) of files being converted; their rows are only
+        # written once conversion finishes
+        self._hashes_in_flight: set[tuple[str, str]] = set()
         self.enable_formula_enrichment = enable_formula_enrichment
+        self.content_hash_algo = self._resolve_content_hash_algo()
+
+    def _resolve_content_hash_algo(self) -> str:
+        """Resolve the configured content hash algorithm to an available one."""
+        algo = self.settings.content_hash_algo
+        if algo == "blake3" and blake3 is None:
+            logger.warning(
+                "blake3 is not installed (install the 'fast-hash' extra); "
+                "falling back to sha256 for content hashing"
+            )
+            return "sha256"
+        return algo
 
     @property
     def docling_wrapper(self) -> DoclingWrapper:
@@ -44,30 +187,82 @@ class DocumentProcessor:
 
         return self._docling_wrapper
 
+    @property
+    def temp_images_root(self) -> Path:
+        """Get or create the shared root for temporary image extraction.
+
+        All conversions extract their images below this directory so it can be
+        dropped with a single sweep. It lives in the image store's scratch
+        directory, keeping extracted images on the same filesystem so storing
+        them is a rename rather than a copy. Roots left behind by processes
+        that have exited are removed when the first root is created.
+        """
+        if self._temp_images_root is None:
+            scratch_path = self.image_storage.scratch_path
+            scratch_path.mkdir(exist_ok=True)
+            _sweep_stale_temp_roots(scratch_path)
+            self._temp_images_root = Path(
+                tempfile.mkdtemp(
+                    prefix=f"{_TEMP_ROOT_PREFIX}{os.getpid()}_", dir=scratch_path
+                )
+            )
+            logger.debug(f"Using temporary image directory: {self._temp_images_root}")
+
+        return self._temp_images_root
+
+    def cleanup_temp_images(self) -> None:
+        """Remove the shared temporary image directory."""
+        if self._temp_images_root is not None:
+            shutil.rmtree(self._temp_images_root, ignore_errors=True)
+            self._temp_images_root = None
+
     async def calculate_file_hash(self, file_path: Path) -> str:
-        """Calculate SHA-256 hash of a file."""
-        hash_sha256 = hashlib.sha256()
+        """Calculate the content hash of a file.
 
-        async with aiofiles.open(file_path, "rb") as f:
-            while chunk := await f.read(8192):
-                hash_sha256.update(chunk)
+        Uses BLAKE3 when configured and installed, otherwise SHA-256.
+        """
+        if self.content_hash_algo == "blake3":
+            return await asyncio.to_thread(_blake3_file_digest, file_path)
 
-        return hash_sha256.hexdigest()
+        return await asyncio.to_thread(_sha256_file_digest, file_path)
 
     def get_mime_type(self, file_path: Path) -> str | None:
         """Get MIME type of a file."""
-        mime_type, _ = mimetypes.guess_type(str(file_path))
-        return mime_type
+        return _mime_for_suffix(file_path.suffix.lower())
+
+    def get_file_info(self, file_path: Path) -> FileInfo:
+        """Stat a file once and collect the attributes used during processing."""
+        stat = file_path.stat()
+        return FileInfo(
+            size=stat.st_size,
+            ctime=stat.st_ctime,
+            mtime=stat.st_mtime,
+            suffix=file_path.suffix.lower(),
+            mime_type=self.get_mime_type(file_path),
+        )
+
+    def _is_supported_name(self, file_path: Path) -> bool:
+        """Check the extension and exclude patterns without touching the disk."""
+        if file_path.suffix.lower() not in self.settings.extensions_set:
+            return False
+        return not self.settings.excluded_re.match(file_path.name)
 
-    def is_supported_file(self, file_path: Path) -> bool:
-        """Check if file is supported for processing."""
-        # Check extension
-        if file_path.suffix.lower() not in self.settings.supported_extensions:
+    def is_supported_file(
+        self, file_path: Path, file_info: FileInfo | None = None
+    ) -> bool:
+        """Check if file is supported for processing.
+
+        Pass a previously gathered ``file_info`` to avoid another stat().
+        """
+        if not self._is_supported_name(file_path):
             return False
 
         # Check size
         try:
-            file_size = file_path.stat().st_size
+            if file_info is not None:
+                file_size = file_info.size
+            else:
+                file_size = file_path.stat().st_size
             if file_size > self.settings.max_file_size_bytes:
                 logger.warning(f"File too large: {file_path} ({file_size} bytes)")
                 return False
@@ -75,31 +270,12 @@ class DocumentProcessor:
             logger.error(f"Cannot access file: {file_path}")
             return False
 
-        # Check exclude patterns
-        filename = file_path.name
-        for pattern in self.settings.exclude_patterns:
-            if filename.startswith(pattern.replace("*", "")):
-                return False
-
         return True
 
     async def extract_metadata(self, file_path: Path) -> dict[str, str]:
         """Extract metadata from a file."""
         try:
-            stat = file_path.stat()
-            metadata = {
-                "file_extension": file_path.suffix.lower(),
-                "file_size_bytes": str(stat.st_size),
-                "created_time": str(stat.st_ctime),
-                "modified_time": str(stat.st_mtime),
-            }
-
-            # Add MIME type if available
-            mime_type = self.get_mime_type(file_path)
-            if mime_type:
-                metadata["mime_type"] = mime_type
-
-            return metadata
+            return self.get_file_info(file_path).to_metadata()
         except Exception as e:
             logger.error(f"Failed to extract metadata from {file_path}: {e}")
             return {}
@@ -107,12 +283,14 @@ class DocumentProcessor:
     async def convert_to_markdown(self, file_path: Path) -> str:
         """Convert document to Markdown using Docling with enhanced configuration."""
         try:
-            logger.info(f"Converting document to Markdown: {file_path}")
+            logger.debug(f"Converting document to Markdown: {file_path}")
 
-            # Use the wrapper to convert with enhanced configuration
-            markdown_content = self.docling_wrapper.convert_to_markdown(file_path)
+            # Docling blocks for seconds; keep it off the event loop
+            markdown_content = await asyncio.to_thread(
+                self.docling_wrapper.convert_to_markdown, file_path
+            )
 
-            logger.info(f"Successfully converted document: {file_path}")
+            logger.debug(f"Successfully converted document: {file_path}")
             return markdown_content
 
         except Exception as e:
@@ -120,12 +298,14 @@ class DocumentProcessor:
             raise
 
     async def convert_to_markdown_with_images(
-        self, file_path: Path
+        self, file_path: Path, temp_dir: Path | None = None
     ) -> tuple[str, list[Path]]:
         """Convert document to markdown and extract images.
 
         Args:
             file_path: Path to the document to convert
+            temp_dir: Temporary directory for extracted images
+                (default: a new directory under the shared temporary root)
 
         Returns:
             Tuple of (markdown_content, list_of_temp_image_paths)
@@ -133,7 +313,13 @@ class DocumentProcessor:
         try:
             if self.settings.images_enabled:
                 # Use the enhanced method that extracts to temporary directory
-                return self.docling_wrapper.convert_to_markdown_with_storage(file_path)
+                if temp_dir is None:
+                    temp_dir = Path(tempfile.mkdtemp(dir=self.temp_images_root))
+                return await asyncio.to_thread(
+                    self.docling_wrapper.convert_to_markdown_with_storage,
+                    file_path,
+                    temp_dir,
+                )
             else:
                 # Fall back to text-only conversion
                 markdown_content = await self.convert_to_markdown(file_path)
@@ -145,197 +331,187 @@ class DocumentProcessor:
     async def process_file(self, file_path: Path) -> bool:
         """Process a single file completely."""
         try:
+            # Reject by name first so unsupported and excluded files cost no stat()
+            if not self._is_supported_name(file_path):
+                logger.debug(f"Skipping unsupported file: {file_path}")
+                return False
+
+            # Stat once; size, times and MIME type are reused below
+            try:
+                file_info = self.get_file_info(file_path)
+            except OSError:
+                logger.error(f"Cannot access file: {file_path}")
+                return False
+
             # Validate file
-            if not self.is_supported_file(file_path):
+            if not self.is_supported_file(file_path, file_info):
                 logger.debug(f"Skipping unsupported file: {file_path}")
                 return False
 
-            # Check if file already exists in database
-            existing_doc = await self.db_manager.get_document_by_path(str(file_path))
-            if existing_doc:
+            # Check if file already exists in database before reading its body
+            if await self.db_manager.document_exists_by_path(str(file_path)):
                 logger.debug(f"File already processed: {file_path}")
                 return True
 
             # Calculate file hash for deduplication
             content_hash = await self.calculate_file_hash(file_path)
-            existing_by_hash = await self.db_manager.get_document_by_hash(content_hash)
-            if existing_by_hash:
-                logger.info(f"File with same content already exists: {file_path}")
-                return True
-
-            # Create document record
-            file_size = file_path.stat().st_size
-            mime_type = self.get_mime_type(file_path)
-
-            document = await self.db_manager.create_document(
-                file_path=str(file_path),
-                filename=file_path.name,
-                content_hash=content_hash,
-                file_size=file_size,
-                mime_type=mime_type,
-            )
-
-            # Update status to processing
-            await self.db_manager.update_document_status(
-                document.id, DocumentStatus.PROCESSING
-            )
 
-            try:
-                # Convert to markdown with optional image extraction
-                if self.settings.images_enabled:
-                    (
-                        markdown_content,
-                        temp_image_paths,
-                    ) = await self.convert_to_markdown_with_images(file_path)
-
-                    # Store images persistently
-                    if temp_image_paths:
-                        try:
-                            stored_images = await self.image_storage.store_images(
-                                document.id, temp_image_paths
-                            )
-
-                            # Save image metadata to database
-                            for stored_image in stored_images:
-                                try:
-                                    await self.db_manager.create_document_image(
-                                        document_id=document.id,
-                                        image_path=str(stored_image.path),
-                                        filename=stored_image.filename,
-                                        image_type=stored_image.image_type,
-                                        image_index=stored_image.image_index,
-                                        file_size=stored_image.file_size,
-                                        width=stored_image.width,
-                                        height=stored_image.height,
-                                        format=stored_image.format,
-                                        extraction_method="docling",
-                                        quality_score=None,
-                                    )
-                                except Exception as e:
-                                    logger.error(
-                                        f"Failed to save image metadata for {stored_image.filename}: {e}"
-                                    )
-                                    # Continue with other images
-
-                            logger.info(
-                                f"Stored {len(stored_images)} images for document {document.id}"
-                            )
-
-                        except Exception as e:
-                            logger.error(
-                                f"Failed to store images for document {document.id}: {e}"
-                            )
-                            # Continue processing without images
-                            stored_images = []
-
-                        # Clean up temporary images
-                        import shutil
-
-                        for temp_path in temp_image_paths:
-                            try:
-                                if temp_path.exists():
-                                    # Remove the temporary directory
-                                    temp_dir = temp_path.parent
-                                    if temp_dir.name.startswith("doceater_images_"):
-                                        shutil.rmtree(temp_dir, ignore_errors=True)
-                                    break  # Only need to remove the temp dir once
-                            except Exception as e:
-                                logger.warning(
-                                    f"Failed to cleanup temporary image directory: {e}"
-                                )
-                else:
-                    # Text-only conversion
-                    markdown_content = await self.convert_to_markdown(file_path)
-
-                # Update document with content
-                await self.db_manager.update_document_content(
-                    document.id,
-                    markdown_content,
-                    DocumentStatus.COMPLETED,
+            # Claim the hash before the lookup so a concurrent copy of the
+            # same content is not converted and stored a second time
+            hash_key = (self.content_hash_algo, content_hash)
+            if hash_key in self._hashes_in_flight:
+                logger.debug(
+                    f"File with same content is already being processed: {file_path}"
                 )
+                return True
+            self._hashes_in_flight.add(hash_key)
+            try:
+                return await self._process_new_file(file_path, file_info, content_hash)
+            finally:
+                self._hashes_in_flight.discard(hash_key)
 
-                # Extract and store metadata
-                metadata = await self.extract_metadata(file_path)
-                if metadata:
-                    await self.db_manager.add_document_metadata(document.id, metadata)
-
-                # Log success with image information
-                log_details = {
-                    "file_size": file_size,
-                    "content_length": len(markdown_content),
-                    "images_enabled": self.settings.images_enabled,
-                }
-
-                if self.settings.images_enabled and "stored_images" in locals():
-                    log_details["images_extracted"] = len(stored_images)
-                    log_details["image_types"] = [
-                        img.image_type.value for img in stored_images
-                    ]
-
-                await self.db_manager.log_processing(
-                    LogLevel.INFO,
-                    f"Successfully processed file: {file_path.name}",
-                    document.id,
-                    log_details,
-                )
+        except Exception as e:
+            logger.error(f"Unexpected error processing file {file_path}: {e}")
+            return False
 
-                logger.info(f"Successfully processed file: {file_path}")
-                return True
+    async def _process_new_file(
+        self, file_path: Path, file_info: FileInfo, content_hash: str
+    ) -> bool:
+        """Convert and store a file whose content hash has been claimed."""
+        existing_by_hash = await self.db_manager.get_document_by_hash(
+            content_hash, self.content_hash_algo
+        )
+        if existing_by_hash:
+            logger.debug(f"File with same content already exists: {file_path}")
+            return True
+
+        file_size = file_info.size
+        mime_type = file_info.mime_type
+
+        # The document row is only written once processing has finished,
+        # so reserve its ID up front for image storage
+        document_id = uuid.uuid4()
+        stored_images: list[StoredImage] = []
 
-            except Exception as e:
-                # Update status to failed
-                await self.db_manager.update_document_status(
-                    document.id, DocumentStatus.FAILED
-                )
+        try:
+            # Convert to markdown with optional image extraction
+            if self.settings.images_enabled:
+                temp_dir = self.temp_images_root / str(document_id)
+                (
+                    markdown_content,
+                    temp_image_paths,
+                ) = await self.convert_to_markdown_with_images(file_path, temp_dir)
 
-                # Cleanup any partially stored images on failure
-                if self.settings.images_enabled and self.settings.images_cleanup_failed:
+                # Store images persistently
+                if temp_image_paths:
                     try:
-                        await self.image_storage.cleanup_document_images(document.id)
+                        stored_images = await self.image_storage.store_images(
+                            document_id, temp_image_paths
+                        )
                         logger.debug(
-                            f"Cleaned up images for failed document {document.id}"
+                            f"Stored {len(stored_images)} images for document {document_id}"
                         )
-                    except Exception as cleanup_error:
-                        logger.warning(
-                            f"Failed to cleanup images for failed document: {cleanup_error}"
+
+                    except Exception as e:
+                        logger.error(
+                            f"Failed to store images for document {document_id}: {e}"
                         )
+                        # Continue processing without images
+                        stored_images = []
 
-                # Log error with partial content recovery attempt
-                error_details = {"error": str(e), "error_type": type(e).__name__}
+                # Drop this document's temporary images; anything left
+                # behind is swept with the shared root
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            else:
+                # Text-only conversion
+                markdown_content = await self.convert_to_markdown(file_path)
 
-                # Try to extract partial content
-                try:
-                    # For corrupted files, try to extract what we can
-                    partial_content = (
-                        f"# {file_path.name}\n\n*File processing failed: {e}*\n\n"
-                    )
-                    partial_content += f"File information:\n- Size: {file_size} bytes\n- Type: {mime_type or 'unknown'}\n"
+            metadata = file_info.to_metadata()
 
-                    await self.db_manager.update_document_content(
-                        document.id,
-                        partial_content,
-                        DocumentStatus.FAILED,
-                    )
+            # Log success with image information
+            log_details = {
+                "file_size": file_size,
+                "content_length": len(markdown_content),
+                "images_enabled": self.settings.images_enabled,
+            }
 
-                    error_details["partial_content_saved"] = True
+            if self.settings.images_enabled:
+                log_details["images_extracted"] = len(stored_images)
+                log_details["image_types"] = [
+                    img.image_type.value for img in stored_images
+                ]
+
+            # Persist document, content, metadata, images and log at once
+            await self.db_manager.create_completed_document(
+                document_id=document_id,
+                file_path=str(file_path),
+                filename=file_path.name,
+                content_hash=content_hash,
+                file_size=file_size,
+                mime_type=mime_type,
+                markdown_content=markdown_content,
+                metadata=metadata,
+                log_details=log_details,
+                images=stored_images,
+                content_hash_algo=self.content_hash_algo,
+            )
+
+            logger.debug(f"Successfully processed file: {file_path}")
+            return True
+
+        except IntegrityError:
+            # Another worker or process recorded this path while it was being
+            # converted; its row stands, and this run's images have no owner
+            if stored_images:
+                await self.image_storage.cleanup_document_images(document_id)
+            logger.debug(f"File was recorded concurrently: {file_path}")
+            return True
+
+        except Exception as e:
+            # Cleanup any partially stored images on failure
+            if self.settings.images_enabled and self.settings.images_cleanup_failed:
+                try:
+                    await self.image_storage.cleanup_document_images(document_id)
+                    logger.debug(f"Cleaned up images for failed document {document_id}")
+                except Exception as cleanup_error:
                     logger.warning(
-                        f"Saved partial content for failed file: {file_path}"
+                        f"Failed to cleanup images for failed document: {cleanup_error}"
                     )
 
-                except Exception as partial_error:
-                    error_details["partial_content_error"] = str(partial_error)
-                    logger.error(f"Failed to save partial content: {partial_error}")
+            # Log error with partial content recovery attempt
+            error_details = {"error": str(e), "error_type": type(e).__name__}
 
-                await self.db_manager.log_processing(
-                    LogLevel.ERROR,
-                    f"Failed to process file: {file_path.name}",
-                    document.id,
-                    error_details,
+            partial_content: str | None = None
+            try:
+                partial_content = _FAILED_TEMPLATE.format(
+                    name=file_path.name,
+                    error=e,
+                    size=file_size,
+                    mime=mime_type or "unknown",
                 )
+                error_details["partial_content_saved"] = True
+            except Exception as partial_error:
+                error_details["partial_content_error"] = str(partial_error)
+                logger.error(f"Failed to build partial content: {partial_error}")
 
-                logger.error(f"Failed to process file {file_path}: {e}")
-                return False
+            # Record the failed document, partial content and error log at once
+            try:
+                await self.db_manager.create_failed_document(
+                    document_id=document_id,
+                    file_path=str(file_path),
+                    filename=file_path.name,
+                    content_hash=content_hash,
+                    file_size=file_size,
+                    mime_type=mime_type,
+                    markdown_content=partial_content,
+                    error_details=error_details,
+                    content_hash_algo=self.content_hash_algo,
+                )
+            except IntegrityError:
+                logger.warning(
+                    f"Not recording failure for {file_path}: "
+                    "a document for this path already exists"
+                )
 
-        except Exception as e:
-            logger.error(f"Unexpected error processing file {file_path}: {e}")
+            logger.error(f"Failed to process file {file_path}: {e}")
             return False
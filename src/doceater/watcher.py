@@ -3,8 +3,12 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import os
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING
 
 from loguru import logger
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
@@ -13,52 +17,210 @@ from watchdog.observers import Observer
 from .config import Settings, get_settings
 from .processor import DocumentProcessor
 
+if TYPE_CHECKING:
+    import re
+    from collections.abc import Callable
+
+# Number of processed files between aggregate progress log lines
+_PROGRESS_EVERY = 100
+
+# Number of file stat signatures remembered for skipping unchanged files
+_STAT_CACHE_SIZE = 10_000
+
+
+def _scan_files(
+    root: Path,
+    extensions: frozenset[str],
+    excluded: re.Pattern[str],
+    recursive: bool,
+) -> list[Path]:
+    """Collect supported, non-excluded files under root in a single walk."""
+    found: list[Path] = []
+    pending = [str(root)]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError as e:
+            logger.warning(f"Cannot scan directory: {e}")
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    suffix = os.path.splitext(entry.name)[1].lower()
+                    if suffix in extensions and not excluded.match(entry.name):
+                        found.append(Path(entry.path))
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+    return found
+
 
 class FileEventHandler(FileSystemEventHandler):
     """Handles file system events."""
 
-    def __init__(self, processor: DocumentProcessor, settings: Settings) -> None:
+    def __init__(
+        self,
+        processor: DocumentProcessor,
+        settings: Settings,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         super().__init__()
         self.processor = processor
         self.settings = settings
-        self.processing_queue: asyncio.Queue[Path] = asyncio.Queue()
-        self._debounce_tasks: dict[str, asyncio.Task[Any]] = {}
+        # Source of the current time for debounce windows, in seconds
+        self._clock = clock
+        # Bounded so a large backlog applies backpressure instead of piling up
+        self.processing_queue: asyncio.Queue[Path] = asyncio.Queue(
+            maxsize=settings.max_concurrent_files * 4
+        )
+        # Open debounce windows keyed by file path: when the window opened,
+        # and when the file last changed
+        self._first_seen: dict[str, float] = {}
+        self._last_seen: dict[str, float] = {}
+        self._wake = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Paths with an event handed to the loop but not yet handled there
+        self._in_flight: set[str] = set()
+        # (st_mtime_ns, st_size) per file as last seen
+        self._stat_cache: OrderedDict[str, tuple[int, int]] = OrderedDict()
 
     def on_created(self, event: FileSystemEvent) -> None:
         """Handle file creation events."""
         if not event.is_directory:
-            self._queue_file_for_processing(Path(event.src_path))
+            self._dispatch(os.fsdecode(event.src_path))
 
     def on_modified(self, event: FileSystemEvent) -> None:
         """Handle file modification events."""
         if not event.is_directory:
-            self._queue_file_for_processing(Path(event.src_path))
+            self._dispatch(os.fsdecode(event.src_path))
 
     def on_moved(self, event: FileSystemEvent) -> None:
         """Handle file move events."""
         if not event.is_directory and hasattr(event, "dest_path"):
-            self._queue_file_for_processing(Path(event.dest_path))
+            self._dispatch(os.fsdecode(event.dest_path))
+
+    def _dispatch(self, file_key: str) -> None:
+        """Hand an event from the observer thread over to the event loop."""
+        if self._loop is None:
+            return
+        # Filter on the raw string so junk events never allocate a Path
+        name = os.path.basename(file_key)
+        if os.path.splitext(name)[1].lower() not in self.settings.extensions_set:
+            return
+        if self.settings.excluded_re.match(name):
+            return
+
+        # Repeat events are common (Windows reports most changes twice); an
+        # event still waiting for the loop will stat the file after this one
+        if file_key in self._in_flight:
+            return
+        self._in_flight.add(file_key)
+        self._loop.call_soon_threadsafe(self._queue_file_for_processing, file_key)
+
+    def _queue_file_for_processing(self, file_key: str) -> None:
+        """Queue a file for processing with debouncing.
+
+        A file is emitted once it has stayed unchanged for
+        processing_delay_seconds, so files still being written are not picked
+        up half-way. A file that never settles is emitted at most
+        max_debounce_seconds after its first change.
+        """
+        self._in_flight.discard(file_key)
+        signature = self._stat_signature(file_key)
+        if signature is None or not self._record_signature(file_key, signature):
+            return
+
+        now = self._clock()
+        self._first_seen.setdefault(file_key, now)
+        self._last_seen[file_key] = now
+        self._wake.set()
 
-    def _queue_file_for_processing(self, file_path: Path) -> None:
-        """Queue a file for processing with debouncing."""
-        file_key = str(file_path)
+    def _stat_signature(self, file_key: str) -> tuple[int, int] | None:
+        """Return a file's (st_mtime_ns, st_size), or None if it is gone."""
+        try:
+            st = os.stat(file_key)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _record_signature(self, file_key: str, signature: tuple[int, int]) -> bool:
+        """Remember a file's stat signature and report whether it changed."""
+        if self._stat_cache.get(file_key) == signature:
+            self._stat_cache.move_to_end(file_key)
+            return False
 
-        # Cancel existing debounce task for this file
-        if file_key in self._debounce_tasks:
-            self._debounce_tasks[file_key].cancel()
+        self._stat_cache[file_key] = signature
+        self._stat_cache.move_to_end(file_key)
+        if len(self._stat_cache) > _STAT_CACHE_SIZE:
+            self._stat_cache.popitem(last=False)
+        return True
 
-        # Create new debounce task
-        async def debounced_add() -> None:
-            await asyncio.sleep(self.settings.processing_delay_seconds)
-            try:
-                await self.processing_queue.put(file_path)
-                logger.debug(f"Queued file for processing: {file_path}")
-            except Exception as e:
-                logger.error(f"Failed to queue file {file_path}: {e}")
-            finally:
-                self._debounce_tasks.pop(file_key, None)
+    def _emit(self, file_key: str) -> bool:
+        """Put a file onto the processing queue; report whether it fit."""
+        try:
+            self.processing_queue.put_nowait(Path(file_key))
+        except asyncio.QueueFull:
+            return False
+        logger.debug(f"Queued file for processing: {file_key}")
+        return True
+
+    def _deadline(self, file_key: str) -> float:
+        """Return when the debounce window for a file closes."""
+        return min(
+            self._last_seen[file_key] + self.settings.processing_delay_seconds,
+            self._first_seen[file_key] + self.settings.max_debounce_seconds,
+        )
 
-        self._debounce_tasks[file_key] = asyncio.create_task(debounced_add())
+    def _close_window(self, file_key: str) -> None:
+        """Forget the debounce window for a file."""
+        del self._first_seen[file_key]
+        del self._last_seen[file_key]
+
+    def _flush(self, now: float) -> float:
+        """Emit files whose debounce window has closed.
+
+        Returns the time the next open window closes.
+        """
+        next_due = float("inf")
+        for file_key in list(self._first_seen):
+            due = self._deadline(file_key)
+            if due > now:
+                next_due = min(next_due, due)
+                continue
+
+            signature = self._stat_signature(file_key)
+            if signature is None:
+                # Deleted or moved away before it settled
+                self._close_window(file_key)
+                continue
+
+            # Changes can land without an event (or before it arrives); only
+            # the max_debounce_seconds cap emits a file that is still changing
+            cap = self._first_seen[file_key] + self.settings.max_debounce_seconds
+            if self._record_signature(file_key, signature) and now < cap:
+                self._last_seen[file_key] = now
+            elif self._emit(file_key):
+                self._close_window(file_key)
+                continue
+            else:
+                # Queue is full; retry once another quiet window has passed
+                self._first_seen[file_key] = self._last_seen[file_key] = now
+            next_due = min(next_due, self._deadline(file_key))
+
+        return next_due
+
+    async def debounce_loop(self) -> None:
+        """Emit files as their debounce windows close."""
+        self._loop = asyncio.get_running_loop()
+
+        while True:
+            now = self._clock()
+            next_due = self._flush(now)
+
+            # Sleep until the nearest deadline or until a new event arrives
+            timeout = None if next_due == float("inf") else next_due - now
+            self._wake.clear()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), timeout)
 
 
 class FileWatcher:
@@ -68,13 +230,29 @@ class FileWatcher:
         self,
         settings: Settings | None = None,
         processor: DocumentProcessor | None = None,
+        clock: Callable[[], float] = time.monotonic,
     ) -> None:
         self.settings = settings or get_settings()
         self.processor = processor or DocumentProcessor(self.settings)
         self.observer: Observer | None = None
-        self.event_handler: FileEventHandler | None = None
-        self._processing_tasks: set[asyncio.Task[Any]] = set()
+        # Source of the current time for debouncing and rate limiting
+        self._clock = clock
+        self.event_handler = FileEventHandler(
+            self.processor, self.settings, clock=clock
+        )
+        # Admission control; the cap is re-read so it can change while running
+        self._slots = asyncio.Condition()
+        self._active = 0
+        # Files currently being processed, so a repeat emit cannot race them
+        self._active_paths: set[Path] = set()
+        self._consumer_task: asyncio.Task[None] | None = None
+        self._debounce_task: asyncio.Task[None] | None = None
         self._running = False
+        self._processed_count = 0
+        self._failed_count = 0
+        # Token bucket for processing_rate_per_sec
+        self._tokens = float(self.settings.processing_burst)
+        self._last_refill = clock()
 
     async def start_watching(self) -> None:
         """Start watching the configured folder."""
@@ -89,8 +267,11 @@ class FileWatcher:
 
         logger.info(f"Starting file watcher for: {watch_path}")
 
-        # Create event handler
-        self.event_handler = FileEventHandler(self.processor, self.settings)
+        # Start the debounce timer loop first so it is bound before events arrive
+        self._debounce_task = asyncio.create_task(
+            self.event_handler.debounce_loop(), name="doceater.debounce"
+        )
+        await asyncio.sleep(0)
 
         # Set up observer
         self.observer = Observer()
@@ -105,7 +286,9 @@ class FileWatcher:
         self._running = True
 
         # Start processing queue consumer
-        asyncio.create_task(self._process_queue())
+        self._consumer_task = asyncio.create_task(
+            self._process_queue(), name="doceater.queue_consumer"
+        )
 
         logger.info("File watcher started successfully")
 
@@ -124,63 +307,121 @@ class FileWatcher:
             self.observer.join()
             self.observer = None
 
-        # Cancel all processing tasks
-        for task in self._processing_tasks:
-            task.cancel()
+        # Stop the debounce timer loop
+        if self._debounce_task:
+            self._debounce_task.cancel()
+            await asyncio.gather(self._debounce_task, return_exceptions=True)
+            self._debounce_task = None
+
+        # Cancel the consumer; its task group cancels in-flight processing
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            await asyncio.gather(self._consumer_task, return_exceptions=True)
+            self._consumer_task = None
 
-        # Wait for tasks to complete
-        if self._processing_tasks:
-            await asyncio.gather(*self._processing_tasks, return_exceptions=True)
-            self._processing_tasks.clear()
+        # Drop all temporary image directories at once
+        self.processor.cleanup_temp_images()
 
         logger.info("File watcher stopped")
 
     async def _process_queue(self) -> None:
         """Process files from the queue."""
-        if not self.event_handler:
-            return
-
+        queue = self.event_handler.processing_queue
         logger.info("Started processing queue consumer")
 
-        while self._running:
-            try:
-                # Wait for a file to process (with timeout to check if still running)
-                try:
-                    file_path = await asyncio.wait_for(
-                        self.event_handler.processing_queue.get(), timeout=1.0
-                    )
-                except TimeoutError:
-                    continue
-
-                # Check if we have too many concurrent tasks
-                if len(self._processing_tasks) >= self.settings.max_concurrent_files:
-                    # Wait for at least one task to complete
-                    done, pending = await asyncio.wait(
-                        self._processing_tasks, return_when=asyncio.FIRST_COMPLETED
-                    )
-                    self._processing_tasks = pending
-
-                # Create processing task
-                task = asyncio.create_task(self._process_file_safe(file_path))
-                self._processing_tasks.add(task)
-
-                # Clean up completed tasks
-                self._processing_tasks = {
-                    t for t in self._processing_tasks if not t.done()
-                }
-
-            except Exception as e:
-                logger.error(f"Error in processing queue: {e}")
-                await asyncio.sleep(1)
-
-        logger.info("Processing queue consumer stopped")
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                # Runs until stop_watching cancels this task
+                while True:
+                    file_path = await queue.get()
+                    if file_path in self._active_paths:
+                        # A second pass would race the first into the
+                        # unique file_path constraint
+                        logger.debug(f"Already processing file: {file_path}")
+                        queue.task_done()
+                        continue
+
+                    # Respect the rate limit, then block until a slot is free
+                    self._active_paths.add(file_path)
+                    try:
+                        await self._take_token()
+                        await self._acquire_slot()
+                    except asyncio.CancelledError:
+                        self._active_paths.discard(file_path)
+                        raise
+                    task = task_group.create_task(self._process_in_slot(file_path))
+                    task.add_done_callback(lambda _: queue.task_done())
+        finally:
+            logger.info("Processing queue consumer stopped")
+
+    async def _take_token(self) -> None:
+        """Wait until the token bucket allows another file to start."""
+        rate = self.settings.processing_rate_per_sec
+        if rate <= 0:
+            return
+
+        while True:
+            now = self._clock()
+            self._tokens = min(
+                float(self.settings.processing_burst),
+                self._tokens + (now - self._last_refill) * rate,
+            )
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / rate)
+
+    async def _acquire_slot(self) -> None:
+        """Wait until fewer than max_concurrent_files files are in flight."""
+        async with self._slots:
+            await self._slots.wait_for(
+                lambda: self._active < self.settings.max_concurrent_files
+            )
+            self._active += 1
+
+    async def _process_in_slot(self, file_path: Path) -> None:
+        """Process a file and give its slot back when done."""
+        try:
+            await self._process_file_safe(file_path)
+        finally:
+            self._active_paths.discard(file_path)
+            async with self._slots:
+                self._active -= 1
+                self._slots.notify_all()
+
+    async def update_settings(self, settings: Settings) -> None:
+        """Apply new settings to a running watcher.
+
+        Concurrency, rate limiting, debouncing and file filters take effect
+        immediately; the processor keeps the settings it was created with.
+        """
+        self.settings = settings
+        self.event_handler.settings = settings
+        async with self._slots:
+            self._slots.notify_all()
 
     async def _process_file_safe(self, file_path: Path) -> None:
         """Process a file with error handling."""
         try:
-            await self.processor.process_file(file_path)
+            success = await self.processor.process_file(file_path)
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {e}")
+            success = False
+
+        self._record_result(success)
+
+    def _record_result(self, success: bool) -> None:
+        """Count a processed file and periodically log aggregate progress."""
+        self._processed_count += 1
+        if not success:
+            self._failed_count += 1
+
+        if self._processed_count % _PROGRESS_EVERY == 0:
+            logger.info(
+                f"Processed {self._processed_count} files "
+                f"({self._failed_count} failed or skipped)"
+            )
 
     async def process_existing_files(self) -> None:
         """Process existing files in the watch folder."""
@@ -192,30 +433,40 @@ class FileWatcher:
         logger.info(f"Processing existing files in: {watch_path}")
 
         # Find all supported files
-        files_to_process = []
-        for ext in self.settings.supported_extensions:
-            if self.settings.watch_recursive:
-                pattern = f"**/*{ext}"
-            else:
-                pattern = f"*{ext}"
-
-            files_to_process.extend(watch_path.glob(pattern))
+        # Walk in a worker thread so watched events keep flowing meanwhile
+        files_to_process = await asyncio.to_thread(
+            _scan_files,
+            watch_path,
+            self.settings.extensions_set,
+            self.settings.excluded_re,
+            self.settings.watch_recursive,
+        )
 
         logger.info(f"Found {len(files_to_process)} existing files to process")
 
-        # Process files with concurrency limit
-        semaphore = asyncio.Semaphore(self.settings.max_concurrent_files)
+        # Feed files through the queue consumer; start one if not watching
+        consumer = None
+        if self._consumer_task is None:
+            consumer = asyncio.create_task(
+                self._process_queue(), name="doceater.existing_consumer"
+            )
 
-        async def process_with_semaphore(file_path: Path) -> None:
-            async with semaphore:
-                await self.processor.process_file(file_path)
+        queue = self.event_handler.processing_queue
+        try:
+            for file_path in files_to_process:
+                await queue.put(file_path)
+            await queue.join()
+        finally:
+            # Also runs when a stop request cancels the backfill
+            if consumer:
+                consumer.cancel()
+                await asyncio.gather(consumer, return_exceptions=True)
 
-        # Process all files
-        tasks = [process_with_semaphore(file_path) for file_path in files_to_process]
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # The watcher may still need the temporary root; otherwise sweep it
+            if not self._running:
+                self.processor.cleanup_temp_images()
 
-        logger.info("Finished processing existing files")
+        logger.info(f"Finished processing {len(files_to_process)} existing files")
 
     async def manual_process_file(self, file_path: str | Path) -> bool:
         """Manually process a specific file."""
@@ -226,4 +477,8 @@ class FileWatcher:
             return False
 
         logger.info(f"Manually processing file: {file_path}")
-        return await self.processor.process_file(file_path)
+        try:
+            return await self.processor.process_file(file_path)
+        finally:
+            if not self._running:
+                self.processor.cleanup_temp_images()
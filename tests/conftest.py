@@ -2,30 +2,46 @@
 
 from __future__ import annotations
 
-import asyncio
+import itertools
+import os
 import tempfile
 import uuid
-from collections.abc import AsyncGenerator, Generator
 from pathlib import Path
-from typing import Any
-from unittest.mock import AsyncMock, MagicMock
+from typing import TYPE_CHECKING, Any
+from unittest.mock import MagicMock
 
 import pytest
 import pytest_asyncio
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import StaticPool
 
 from doceater.config import Settings
 from doceater.database import DatabaseManager
-from doceater.models import Base
+from doceater.models import Base, Document
 
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
 
-@pytest.fixture(scope="session")
-def event_loop() -> Generator[asyncio.AbstractEventLoop]:
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+# Named in-memory database per xdist worker, so workers never share state
+_WORKER = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+TEST_DATABASE_URL = (
+    f"sqlite+aiosqlite:///file:doceater_{_WORKER}?mode=memory&cache=shared&uri=true"
+)
+
+# Sample PDFs, smallest first, collected once at import
+_TEST_PDFS_DIR = (Path(__file__).parent.parent / "test_pdfs").resolve()
+_SAMPLE_PDFS = (
+    sorted(_TEST_PDFS_DIR.glob("*.pdf"), key=lambda p: p.stat().st_size)
+    if _TEST_PDFS_DIR.exists()
+    else []
+)
 
 
 @pytest.fixture
@@ -39,9 +55,10 @@ def temp_dir() -> Generator[Path]:
 def test_settings(temp_dir: Path) -> Settings:
     """Create test settings with temporary directories."""
     return Settings(
-        database_url="sqlite+aiosqlite:///:memory:",
+        database_url=TEST_DATABASE_URL,
         watch_folder=str(temp_dir),
         watch_recursive=True,
+        images_base_path=str(temp_dir / "images"),
         max_file_size_mb=50,  # Increased to handle larger test PDFs
         supported_extensions=[".pdf", ".txt"],
         exclude_patterns=[".*", "~*", "*.tmp"],
@@ -52,15 +69,34 @@ def test_settings(temp_dir: Path) -> Settings:
     )
 
 
-@pytest_asyncio.fixture
-async def test_engine(test_settings: Settings) -> AsyncGenerator[AsyncEngine]:
-    """Create a test database engine."""
+@pytest_asyncio.fixture(scope="session")
+async def test_engine() -> AsyncGenerator[AsyncEngine]:
+    """Create the test database engine and schema once per session."""
+    # A single shared connection keeps the in-memory database alive
     engine = create_async_engine(
-        test_settings.database_url,
+        TEST_DATABASE_URL,
         echo=False,
-        pool_pre_ping=True,
+        poolclass=StaticPool,
+        # The connection never goes stale and each test rolls back itself
+        pool_reset_on_return=None,
+        connect_args={"check_same_thread": False},
     )
 
+    # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs work with the sqlite driver
+    @event.listens_for(engine.sync_engine, "connect")
+    def _disable_driver_transactions(dbapi_connection: Any, _: Any) -> None:
+        dbapi_connection.isolation_level = None
+        # The test database is throwaway, so skip journaling and fsyncs
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _emit_begin(conn: Any) -> None:
+        conn.exec_driver_sql("BEGIN")
+
     # Create all tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -71,31 +107,99 @@ async def test_engine(test_settings: Settings) -> AsyncGenerator[AsyncEngine]:
     await engine.dispose()
 
 
-@pytest_asyncio.fixture
-async def test_session(test_engine: AsyncEngine) -> AsyncGenerator[AsyncSession]:
-    """Create a test database session."""
-    async_session = sessionmaker(
-        test_engine, class_=AsyncSession, expire_on_commit=False
+@pytest_asyncio.fixture(scope="session")
+async def shared_connection(
+    test_engine: AsyncEngine,
+) -> AsyncGenerator[AsyncConnection]:
+    """Open one connection and outer transaction for the whole session."""
+    async with test_engine.connect() as conn:
+        transaction = await conn.begin()
+        yield conn
+        if transaction.is_active:
+            await transaction.rollback()
+
+
+@pytest.fixture
+async def test_connection(
+    shared_connection: AsyncConnection,
+) -> AsyncGenerator[AsyncConnection]:
+    """Run the test inside a SAVEPOINT that is rolled back afterwards."""
+    savepoint = await shared_connection.begin_nested()
+    yield shared_connection
+    if savepoint.is_active:
+        await savepoint.rollback()
+
+
+@pytest.fixture
+def test_session_factory(
+    test_connection: AsyncConnection,
+) -> async_sessionmaker[AsyncSession]:
+    """Create sessions whose commits only release a SAVEPOINT."""
+    return async_sessionmaker(
+        bind=test_connection,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
     )
 
-    async with async_session() as session:
+
+@pytest.fixture
+async def test_session(
+    test_session_factory: async_sessionmaker[AsyncSession],
+) -> AsyncGenerator[AsyncSession]:
+    """Create a test database session."""
+    async with test_session_factory() as session:
         yield session
 
 
-@pytest_asyncio.fixture
-async def test_db_manager(
-    test_settings: Settings, test_engine: AsyncEngine
-) -> AsyncGenerator[DatabaseManager]:
-    """Create a test database manager."""
-    db_manager = DatabaseManager(test_settings)
-    # Override the engine with our test engine
-    db_manager._engine = test_engine
-    db_manager._session_factory = None  # Reset to use new engine
+@pytest.fixture
+def test_db_manager(
+    test_settings: Settings,
+    test_connection: AsyncConnection,
+) -> DatabaseManager:
+    """Create a test database manager bound to the test transaction."""
+    return DatabaseManager.from_connection(test_connection, test_settings)
 
-    yield db_manager
 
-    # Clean up
-    await db_manager.close()
+@pytest.fixture
+def make_doc(
+    test_db_manager: DatabaseManager,
+) -> Callable[..., Awaitable[Document]]:
+    """Create documents with unique defaults; keyword arguments override them."""
+    counter = itertools.count()
+
+    async def _make_doc(**kwargs: Any) -> Document:
+        n = next(counter)
+        fields: dict[str, Any] = {
+            "file_path": f"/test/docs/doc{n}.pdf",
+            "filename": f"doc{n}.pdf",
+            "content_hash": f"hash{n}",
+            "file_size": 1024,
+        }
+        fields.update(kwargs)
+        return await test_db_manager.create_document(**fields)
+
+    return _make_doc
+
+
+@pytest.fixture(scope="session")
+def shared_docling_wrapper() -> Generator[Any]:
+    """Share one Docling wrapper so its models load once per session.
+
+    Models are read from the local artifacts directory with the Hugging Face
+    hub offline; tests are skipped when the models are not available.
+    """
+    # Keep Docling out of conftest's own imports; modules that import
+    # doceater.processor (test_processor, test_watcher) still need it installed
+    pytest.importorskip("docling")
+    from doceater.docling_wrapper import DoclingWrapper, resolve_artifacts_path
+
+    artifacts_path = resolve_artifacts_path()
+    if not os.path.isdir(artifacts_path):
+        pytest.skip(f"Docling models not found at {artifacts_path}")
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("HF_HUB_OFFLINE", "1")
+        yield DoclingWrapper(artifacts_path=artifacts_path)
 
 
 @pytest.fixture
@@ -164,48 +268,21 @@ def create_test_file():
     return _create_file
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def test_pdfs_dir() -> Path:
     """Get the test PDFs directory."""
-    return Path(__file__).parent.parent / "test_pdfs"
+    return _TEST_PDFS_DIR
 
 
-@pytest.fixture
-def sample_pdf_files(test_pdfs_dir: Path) -> list[Path]:
-    """Get list of sample PDF files for testing."""
-    pdf_files = list(test_pdfs_dir.glob("*.pdf"))
-    if not pdf_files:
+@pytest.fixture(scope="session")
+def sample_pdf_files() -> list[Path]:
+    """Get list of sample PDF files for testing, smallest first."""
+    if not _SAMPLE_PDFS:
         pytest.skip("No PDF files found in test_pdfs directory")
-    return pdf_files
+    return list(_SAMPLE_PDFS)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def small_pdf_file(sample_pdf_files: list[Path]) -> Path:
     """Get a small PDF file for testing."""
-    if not sample_pdf_files:
-        pytest.skip("No PDF files available for testing")
-
-    # Sort by file size and return the smallest one
-    pdf_files_with_size = [(f, f.stat().st_size) for f in sample_pdf_files]
-    pdf_files_with_size.sort(key=lambda x: x[1])  # Sort by size
-    return pdf_files_with_size[0][0]  # Return the smallest file
-
-
-# Async mock helpers
-class AsyncMockContext:
-    """Helper for creating async context managers in mocks."""
-
-    def __init__(self, return_value: Any = None):
-        self.return_value = return_value
-
-    async def __aenter__(self):
-        return self.return_value
-
-    async def __aexit__(self, *_):
-        return None
-
-
-def create_async_mock(**kwargs) -> AsyncMock:
-    """Create an AsyncMock with common setup."""
-    mock = AsyncMock(**kwargs)
-    return mock
+    return sample_pdf_files[0]
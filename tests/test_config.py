@@ -33,9 +33,13 @@ class TestSettings:
             ".xml",
         ]
         assert settings.exclude_patterns == [".*", "~*", "*.tmp", "*.temp"]
+        assert settings.content_hash_algo == "sha256"
         assert settings.docling_enrich_formula is True
         assert settings.max_concurrent_files == 3
         assert settings.processing_delay_seconds == 1.0
+        assert settings.max_debounce_seconds == 30.0
+        assert settings.processing_rate_per_sec == 0.0
+        assert settings.processing_burst == 10
         assert settings.log_level == "INFO"
 
     def test_custom_settings(self, temp_dir):
@@ -73,6 +77,10 @@ class TestSettings:
         settings = Settings(max_file_size_mb=10)
 
         assert settings.max_file_size_bytes == 10 * 1024 * 1024
+        assert ".pdf" in settings.extensions_set
+        assert settings.excluded_re.match(".hidden")
+        assert settings.excluded_re.match("draft.tmp")
+        assert not settings.excluded_re.match("report.pdf")
 
     def test_environment_variables(self, monkeypatch, temp_dir):
         """Test loading from environment variables."""
@@ -143,6 +151,15 @@ DOCEATER_LOG_LEVEL=ERROR
         with pytest.raises(ValidationError):
             Settings(log_level="INVALID")
 
+        with pytest.raises(ValidationError):
+            Settings(content_hash_algo="md5")
+
+        with pytest.raises(ValidationError):
+            Settings(processing_burst=0)
+
+        with pytest.raises(ValidationError):
+            Settings(processing_delay_seconds=2.0, max_debounce_seconds=1.0)
+
     def test_case_insensitive_env_vars(self, monkeypatch, temp_dir):
         """Test that environment variables are case insensitive."""
         # Create test directory
@@ -2,17 +2,24 @@
 
 from __future__ import annotations
 
+import asyncio
 import uuid
+from collections.abc import Awaitable, Callable
+from pathlib import Path
 
 import pytest
 
 from doceater.database import DatabaseManager
+from doceater.image_storage import StoredImage
 from doceater.models import (
     Document,
     DocumentStatus,
+    ImageType,
     LogLevel,
 )
 
+MakeDoc = Callable[..., Awaitable[Document]]
+
 
 class TestDatabaseManager:
     """Test DatabaseManager operations."""
@@ -33,6 +40,50 @@ class TestDatabaseManager:
             result = await session.execute(text("SELECT COUNT(*) FROM documents"))
             assert result.scalar() == 0
 
+    @pytest.mark.asyncio
+    async def test_warm_pool(self, test_settings, temp_dir):
+        """Test pre-opening pooled connections."""
+        settings = test_settings.model_copy(
+            update={"database_url": f"sqlite+aiosqlite:///{temp_dir / 'pool.db'}"}
+        )
+        db_manager = DatabaseManager(settings)
+        try:
+            await db_manager.warm_pool(2)
+            assert db_manager.engine.pool.checkedin() == 2
+            assert db_manager.engine.pool.checkedout() == 0
+        finally:
+            await db_manager.close()
+
+    @pytest.mark.asyncio
+    async def test_warm_pool_capped_at_pool_size(self, test_settings, temp_dir):
+        """Test warming more connections than the pool holds does not block."""
+        settings = test_settings.model_copy(
+            update={"database_url": f"sqlite+aiosqlite:///{temp_dir / 'pool.db'}"}
+        )
+        db_manager = DatabaseManager(settings)
+        try:
+            pool = db_manager.engine.pool
+            # Well beyond pool_size plus max_overflow (5 + 10 by default)
+            await asyncio.wait_for(db_manager.warm_pool(50), 5)
+            assert pool.checkedin() == pool.size()
+            assert pool.checkedout() == 0
+        finally:
+            await db_manager.close()
+
+    @pytest.mark.asyncio
+    async def test_close_leaves_bound_connection_open(
+        self, test_db_manager: DatabaseManager, test_connection
+    ):
+        """Test a manager built from a connection does not close it."""
+        from sqlalchemy import text
+
+        assert test_db_manager.engine is test_connection.engine
+        await test_db_manager.close()
+
+        assert not test_connection.closed
+        result = await test_connection.execute(text("SELECT COUNT(*) FROM documents"))
+        assert result.scalar() == 0
+
     @pytest.mark.asyncio
     async def test_create_document(self, test_db_manager: DatabaseManager):
         """Test creating a document."""
@@ -56,14 +107,13 @@ class TestDatabaseManager:
         assert doc.status == DocumentStatus.PENDING
 
     @pytest.mark.asyncio
-    async def test_get_document_by_path(self, test_db_manager: DatabaseManager):
+    async def test_get_document_by_path(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
         """Test getting document by file path."""
         # Create a document
-        created_doc = await test_db_manager.create_document(
-            file_path="/test/unique/path.pdf",
-            filename="path.pdf",
-            content_hash="unique123",
-            file_size=2048,
+        created_doc = await make_doc(
+            file_path="/test/unique/path.pdf", filename="path.pdf"
         )
 
         # Get by path
@@ -77,15 +127,26 @@ class TestDatabaseManager:
         assert doc is None
 
     @pytest.mark.asyncio
-    async def test_get_document_by_hash(self, test_db_manager: DatabaseManager):
+    async def test_document_exists_by_path(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
+        """Test probing for a document by file path."""
+        await make_doc(file_path="/test/exists_probe/doc.pdf")
+
+        assert await test_db_manager.document_exists_by_path(
+            "/test/exists_probe/doc.pdf"
+        )
+        assert not await test_db_manager.document_exists_by_path(
+            "/non/existent/path.pdf"
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_document_by_hash(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
         """Test getting document by content hash."""
         # Create a document
-        created_doc = await test_db_manager.create_document(
-            file_path="/test/hash/test.pdf",
-            filename="test.pdf",
-            content_hash="uniquehash123",
-            file_size=1024,
-        )
+        created_doc = await make_doc(content_hash="uniquehash123")
 
         # Get by hash
         doc = await test_db_manager.get_document_by_hash("uniquehash123")
@@ -97,17 +158,106 @@ class TestDatabaseManager:
         doc = await test_db_manager.get_document_by_hash("nonexistenthash")
         assert doc is None
 
+        # Hashes from another algorithm never match
+        doc = await test_db_manager.get_document_by_hash("uniquehash123", "blake3")
+        assert doc is None
+
     @pytest.mark.asyncio
-    async def test_update_document_content(self, test_db_manager: DatabaseManager):
-        """Test updating document content and status."""
-        # Create a document
-        created_doc = await test_db_manager.create_document(
-            file_path="/test/update/doc.pdf",
+    async def test_get_document_by_hash_duplicates(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
+        """Test a hash shared by several documents returns one of them."""
+        first = await make_doc(content_hash="sharedhash")
+        second = await make_doc(content_hash="sharedhash")
+
+        doc = await test_db_manager.get_document_by_hash("sharedhash")
+        assert doc is not None
+        assert doc.id in {first.id, second.id}
+
+    @pytest.mark.asyncio
+    async def test_create_completed_document(self, test_db_manager: DatabaseManager):
+        """Test creating a processed document with metadata, images and log."""
+        document_id = uuid.uuid4()
+        image = StoredImage(
+            path=Path("2025/01/19/doc-table-1.png"),
+            filename="doc-table-1.png",
+            image_type=ImageType.TABLE,
+            image_index=1,
+            file_size=512,
+            width=100,
+            height=50,
+            format="PNG",
+        )
+
+        returned_id = await test_db_manager.create_completed_document(
+            document_id=document_id,
+            file_path="/test/completed/doc.pdf",
+            filename="doc.pdf",
+            content_hash="completed123",
+            file_size=1024,
+            mime_type="application/pdf",
+            markdown_content="# Completed\n\nContent",
+            metadata={"file_extension": ".pdf"},
+            log_details={"file_size": 1024},
+            images=[image],
+        )
+        assert returned_id == document_id
+
+        doc = await test_db_manager.get_document_by_id(document_id)
+        assert doc is not None
+        assert doc.status == DocumentStatus.COMPLETED
+        assert doc.markdown_content == "# Completed\n\nContent"
+        assert doc.processed_at is not None
+
+        metadata = await test_db_manager.get_document_metadata(document_id)
+        assert metadata == {"file_extension": ".pdf"}
+
+        images = await test_db_manager.get_document_images(document_id)
+        assert len(images) == 1
+        assert images[0].image_type == ImageType.TABLE
+        assert images[0].image_path == str(image.path)
+
+        logs = await test_db_manager.get_processing_logs(document_id=document_id)
+        assert len(logs) == 1
+        assert logs[0].level == LogLevel.INFO
+        assert logs[0].details == {"file_size": 1024}
+
+    @pytest.mark.asyncio
+    async def test_create_failed_document(self, test_db_manager: DatabaseManager):
+        """Test recording a failed document with its error log."""
+        document_id = uuid.uuid4()
+
+        await test_db_manager.create_failed_document(
+            document_id=document_id,
+            file_path="/test/failed/doc.pdf",
             filename="doc.pdf",
-            content_hash="update123",
+            content_hash="failed123",
             file_size=1024,
+            mime_type="application/pdf",
+            markdown_content="# doc.pdf\n\n*File processing failed*",
+            error_details={"error": "boom"},
+            content_hash_algo="blake3",
         )
 
+        doc = await test_db_manager.get_document_by_id(document_id)
+        assert doc is not None
+        assert doc.status == DocumentStatus.FAILED
+        assert doc.content_hash_algo == "blake3"
+        assert doc.markdown_content == "# doc.pdf\n\n*File processing failed*"
+
+        logs = await test_db_manager.get_processing_logs(document_id=document_id)
+        assert len(logs) == 1
+        assert logs[0].level == LogLevel.ERROR
+        assert logs[0].details == {"error": "boom"}
+
+    @pytest.mark.asyncio
+    async def test_update_document_content(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
+        """Test updating document content and status."""
+        # Create a document
+        created_doc = await make_doc()
+
         # Update content
         markdown_content = "# Updated Document\n\nThis is updated content."
         await test_db_manager.update_document_content(
@@ -123,15 +273,12 @@ class TestDatabaseManager:
         assert doc.status == DocumentStatus.COMPLETED
 
     @pytest.mark.asyncio
-    async def test_update_document_status(self, test_db_manager: DatabaseManager):
+    async def test_update_document_status(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
         """Test updating document status."""
         # Create a document
-        created_doc = await test_db_manager.create_document(
-            file_path="/test/status/doc.pdf",
-            filename="doc.pdf",
-            content_hash="status123",
-            file_size=1024,
-        )
+        created_doc = await make_doc()
 
         # Update status to processing
         await test_db_manager.update_document_status(
@@ -155,19 +302,24 @@ class TestDatabaseManager:
     async def test_list_documents(self, test_db_manager: DatabaseManager):
         """Test listing documents with filters."""
         # Create multiple documents with different statuses
-        doc1 = await test_db_manager.create_document(
-            file_path="/test/list/doc1.pdf",
-            filename="doc1.pdf",
-            content_hash="list1",
-            file_size=1024,
-        )
-
-        doc2 = await test_db_manager.create_document(
-            file_path="/test/list/doc2.pdf",
-            filename="doc2.pdf",
-            content_hash="list2",
-            file_size=2048,
+        doc1, doc2 = await test_db_manager.create_documents_bulk(
+            [
+                {
+                    "file_path": "/test/list/doc1.pdf",
+                    "filename": "doc1.pdf",
+                    "content_hash": "list1",
+                    "file_size": 1024,
+                },
+                {
+                    "file_path": "/test/list/doc2.pdf",
+                    "filename": "doc2.pdf",
+                    "content_hash": "list2",
+                    "file_size": 2048,
+                },
+            ]
         )
+        assert doc1.filename == "doc1.pdf"
+        assert doc1.status == DocumentStatus.PENDING
 
         # Update one to completed
         await test_db_manager.update_document_status(doc2.id, DocumentStatus.COMPLETED)
@@ -198,15 +350,12 @@ class TestDatabaseManager:
 
     @pytest.mark.asyncio
     async def test_document_exists_after_creation(
-        self, test_db_manager: DatabaseManager
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
     ):
         """Test that a document exists after creation and can be retrieved."""
         # Create a document
-        created_doc = await test_db_manager.create_document(
-            file_path="/test/exists/doc.pdf",
-            filename="doc.pdf",
-            content_hash="exists123",
-            file_size=1024,
+        created_doc = await make_doc(
+            file_path="/test/exists/doc.pdf", filename="doc.pdf"
         )
 
         # Verify it exists by ID
@@ -221,15 +370,12 @@ class TestDatabaseManager:
         assert doc_by_path.id == created_doc.id
 
     @pytest.mark.asyncio
-    async def test_add_document_metadata(self, test_db_manager: DatabaseManager):
+    async def test_add_document_metadata(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
         """Test adding document metadata."""
         # Create a document
-        created_doc = await test_db_manager.create_document(
-            file_path="/test/metadata/doc.pdf",
-            filename="doc.pdf",
-            content_hash="meta123",
-            file_size=1024,
-        )
+        created_doc = await make_doc()
 
         # Add metadata
         metadata = {
@@ -263,50 +409,46 @@ class TestDatabaseManager:
         assert all_metadata == expected_metadata
 
     @pytest.mark.asyncio
-    async def test_get_document_metadata_empty(self, test_db_manager: DatabaseManager):
+    async def test_get_document_metadata_empty(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
         """Test getting metadata for document with no metadata."""
         # Create a document
-        created_doc = await test_db_manager.create_document(
-            file_path="/test/empty_metadata/doc.pdf",
-            filename="doc.pdf",
-            content_hash="empty123",
-            file_size=1024,
-        )
+        created_doc = await make_doc()
 
         # Get metadata for document with no metadata
         metadata = await test_db_manager.get_document_metadata(created_doc.id)
         assert metadata == {}
 
     @pytest.mark.asyncio
-    async def test_log_processing(self, test_db_manager: DatabaseManager):
+    async def test_log_processing(
+        self, test_db_manager: DatabaseManager, make_doc: MakeDoc
+    ):
         """Test logging processing events."""
         # Create a document
-        created_doc = await test_db_manager.create_document(
-            file_path="/test/log/doc.pdf",
-            filename="doc.pdf",
-            content_hash="log123",
-            file_size=1024,
-        )
-
-        # Log processing events
-        await test_db_manager.log_processing(
-            LogLevel.INFO,
-            "Processing started",
-            created_doc.id,
-            {"file_size": 1024},
-        )
-
-        await test_db_manager.log_processing(
-            LogLevel.WARNING,
-            "Minor issue encountered",
-            created_doc.id,
-        )
-
-        await test_db_manager.log_processing(
-            LogLevel.ERROR,
-            "System error",
-            None,  # System-level error
-            {"error_code": 500},
+        created_doc = await make_doc()
+
+        # Log processing events in one batch
+        await test_db_manager.log_processing_batch(
+            [
+                {
+                    "level": LogLevel.INFO,
+                    "message": "Processing started",
+                    "document_id": created_doc.id,
+                    "details": {"file_size": 1024},
+                },
+                {
+                    "level": LogLevel.WARNING,
+                    "message": "Minor issue encountered",
+                    "document_id": created_doc.id,
+                },
+                {
+                    "level": LogLevel.ERROR,
+                    "message": "System error",
+                    "document_id": None,  # System-level error
+                    "details": {"error_code": 500},
+                },
+            ]
         )
 
         # Verify logs were stored correctly
@@ -314,19 +456,17 @@ class TestDatabaseManager:
         assert len(all_logs) == 3
 
         # Check document-specific logs
-        doc_logs = await test_db_manager.get_processing_logs(document_id=created_doc.id)
+        doc_logs = [log for log in all_logs if log.document_id == created_doc.id]
         assert len(doc_logs) == 2
 
         # Check logs by level
-        error_logs = await test_db_manager.get_processing_logs(level=LogLevel.ERROR)
+        error_logs = [log for log in all_logs if log.level == LogLevel.ERROR]
         assert len(error_logs) == 1
         assert error_logs[0].message == "System error"
         assert error_logs[0].details == {"error_code": 500}
 
         # Check specific log content
-        info_logs = await test_db_manager.get_processing_logs(
-            document_id=created_doc.id, level=LogLevel.INFO
-        )
+        info_logs = [log for log in doc_logs if log.level == LogLevel.INFO]
         assert len(info_logs) == 1
         assert info_logs[0].message == "Processing started"
         assert info_logs[0].details == {"file_size": 1024}
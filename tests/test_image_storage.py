@@ -1,7 +1,12 @@
 """Tests for image storage functionality."""
 
+import errno
+import io
+import os
 import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import patch
 
@@ -22,30 +27,49 @@ class TestImageStorageManager:
         with tempfile.TemporaryDirectory() as temp_dir:
             yield Path(temp_dir)
 
-    @pytest.fixture
-    def test_settings(self, temp_storage_dir):
-        """Create test settings with temporary storage directory."""
+    @pytest.fixture(scope="module")
+    def base_settings(self, tmp_path_factory):
+        """Validate the shared image storage settings once per module."""
         return Settings(
             database_url="sqlite+aiosqlite:///:memory:",
-            images_base_path=str(temp_storage_dir),
+            images_base_path=str(tmp_path_factory.mktemp("images")),
             images_enabled=True,
             images_max_size_mb=10,
         )
 
+    @pytest.fixture
+    def test_settings(self, base_settings, temp_storage_dir):
+        """Create test settings with temporary storage directory."""
+        # model_copy skips validation, so resolve the path the way the validator would
+        return base_settings.model_copy(
+            update={"images_base_path": str(temp_storage_dir.resolve())}
+        )
+
     @pytest.fixture
     def storage_manager(self, test_settings):
         """Create ImageStorageManager instance."""
         return ImageStorageManager(test_settings)
 
+    @pytest.fixture(scope="module")
+    def sample_png(self):
+        """Encode the sample PNG in memory once per module."""
+        buf = io.BytesIO()
+        Image.new("RGB", (100, 100), color="red").save(buf, "PNG")
+        return buf.getvalue()
+
     @pytest.fixture
-    def sample_image(self, temp_storage_dir):
-        """Create a sample test image."""
+    def sample_image_buffer(self, sample_png):
+        """Provide the sample PNG as an in-memory stream."""
+        return io.BytesIO(sample_png)
+
+    @pytest.fixture
+    def sample_image(self, temp_storage_dir, sample_png):
+        """Write the sample image into this test's storage directory.
+
+        store_images moves its sources, so each test gets its own file.
+        """
         image_path = temp_storage_dir / "test_image.png"
-        
-        # Create a simple test image
-        img = Image.new('RGB', (100, 100), color='red')
-        img.save(image_path, 'PNG')
-        
+        image_path.write_bytes(sample_png)
         return image_path
 
     def test_storage_manager_initialization(self, storage_manager, test_settings):
@@ -54,21 +78,18 @@ class TestImageStorageManager:
         assert storage_manager.base_path.exists()
         assert storage_manager.base_path.is_dir()
 
-    def test_get_storage_path_with_date_organization(self, storage_manager):
+    def test_get_storage_path_with_date_organization(self, test_settings):
         """Test storage path generation with date organization."""
+        storage_manager = ImageStorageManager(
+            test_settings, clock=lambda: datetime(2025, 1, 19)
+        )
         doc_id = uuid.uuid4()
-        
-        with patch('doceater.image_storage.datetime') as mock_datetime:
-            # Mock current date
-            mock_datetime.now.return_value.year = 2025
-            mock_datetime.now.return_value.month = 1
-            mock_datetime.now.return_value.day = 19
-            
-            path = storage_manager._get_storage_path(doc_id)
-            
-            expected_path = storage_manager.base_path / "2025" / "01" / "19" / str(doc_id)
-            assert path == expected_path
-            assert path.exists()
+
+        path = storage_manager._get_storage_path(doc_id)
+
+        expected_path = storage_manager.base_path / "2025" / "01" / "19" / str(doc_id)
+        assert path == expected_path
+        assert path.exists()
 
     def test_get_storage_path_without_date_organization(self, test_settings, temp_storage_dir):
         """Test storage path generation without date organization."""
@@ -82,37 +103,44 @@ class TestImageStorageManager:
         assert path == expected_path
         assert path.exists()
 
-    def test_extract_image_metadata(self, storage_manager, sample_image):
+    def test_extract_image_metadata(self, storage_manager, sample_image_buffer):
         """Test image metadata extraction."""
-        metadata = storage_manager._extract_image_metadata(sample_image)
+        metadata = storage_manager._extract_image_metadata(sample_image_buffer)
         
         assert metadata['width'] == 100
         assert metadata['height'] == 100
         assert metadata['format'] == 'PNG'
         assert metadata['mode'] == 'RGB'
 
-    def test_determine_image_type(self, storage_manager):
+    @pytest.mark.parametrize(
+        ("filename", "expected"),
+        [
+            ("table-1.png", ImageType.TABLE),
+            ("picture-1.png", ImageType.PICTURE),
+            ("formula-1.png", ImageType.FORMULA),
+            ("chart-1.png", ImageType.CHART),
+            ("diagram-1.png", ImageType.DIAGRAM),
+            ("page-1.png", ImageType.PAGE),
+            ("unknown.png", ImageType.PICTURE),
+            ("timetable-picture-2.png", ImageType.PICTURE),
+            ("homepage-table-3.png", ImageType.TABLE),
+        ],
+    )
+    def test_determine_image_type(self, storage_manager, filename, expected):
         """Test image type determination from filename."""
-        assert storage_manager._determine_image_type("table-1.png") == ImageType.TABLE
-        assert storage_manager._determine_image_type("picture-1.png") == ImageType.PICTURE
-        assert storage_manager._determine_image_type("formula-1.png") == ImageType.FORMULA
-        assert storage_manager._determine_image_type("chart-1.png") == ImageType.CHART
-        assert storage_manager._determine_image_type("diagram-1.png") == ImageType.DIAGRAM
-        assert storage_manager._determine_image_type("page-1.png") == ImageType.PAGE
-        assert storage_manager._determine_image_type("unknown.png") == ImageType.PICTURE
+        assert storage_manager._determine_image_type(filename) == expected
 
     def test_validate_image_size(self, storage_manager, sample_image):
         """Test image size validation."""
-        # Should pass for normal sized image
-        assert storage_manager._validate_image_size(sample_image) is True
-
-        # Test with size limit - check actual file size first
         file_size_bytes = sample_image.stat().st_size
-        file_size_mb = file_size_bytes / (1024 * 1024)
+
+        # Should pass for normal sized image
+        assert storage_manager._validate_image_size(sample_image, file_size_bytes) is True
 
         # Set limit smaller than actual file size
+        file_size_mb = file_size_bytes / (1024 * 1024)
         storage_manager.settings.images_max_size_mb = file_size_mb * 0.5
-        assert storage_manager._validate_image_size(sample_image) is False
+        assert storage_manager._validate_image_size(sample_image, file_size_bytes) is False
 
     @pytest.mark.asyncio
     async def test_store_images_success(self, storage_manager, sample_image):
@@ -134,6 +162,33 @@ class TestImageStorageManager:
         assert stored_image.height == 100
         assert stored_image.format == "PNG"
 
+    @pytest.mark.asyncio
+    async def test_store_images_moves_source(self, storage_manager, sample_image):
+        """Test that stored images are moved out of their source location."""
+        doc_id = uuid.uuid4()
+
+        stored_images = await storage_manager.store_images(doc_id, [sample_image])
+
+        assert len(stored_images) == 1
+        assert not sample_image.exists()
+        assert (storage_manager.base_path / stored_images[0].path).exists()
+
+    @pytest.mark.asyncio
+    async def test_store_images_cross_device(self, storage_manager, sample_image):
+        """Test fallback to copy when the source is on another filesystem."""
+        doc_id = uuid.uuid4()
+
+        with patch(
+            "doceater.image_storage.os.rename",
+            side_effect=OSError(errno.EXDEV, "Invalid cross-device link"),
+        ):
+            stored_images = await storage_manager.store_images(doc_id, [sample_image])
+
+        assert len(stored_images) == 1
+        assert stored_images[0].width == 100
+        assert not sample_image.exists()
+        assert (storage_manager.base_path / stored_images[0].path).exists()
+
     @pytest.mark.asyncio
     async def test_store_images_disabled(self, test_settings, sample_image):
         """Test image storage when disabled."""
@@ -179,7 +234,8 @@ class TestImageStorageManager:
         # Verify storage path exists and has files
         storage_path = storage_manager._get_storage_path(doc_id)
         assert storage_path.exists()
-        assert len(list(storage_path.iterdir())) > 0
+        with os.scandir(storage_path) as entries:
+            assert next(entries, None) is not None
         
         # Cleanup images
         deleted_count = await storage_manager.cleanup_document_images(doc_id)
@@ -211,6 +267,75 @@ class TestImageStorageManager:
         assert isinstance(stats['total_size_bytes'], int)
         assert isinstance(stats['total_size_mb'], float)
 
+    @pytest.mark.asyncio
+    async def test_storage_stats_track_store_and_cleanup(self, storage_manager, sample_png, tmp_path):
+        """Test that storage statistics follow stored and removed images."""
+        # Extracted images arrive from outside the storage tree
+        source_image = tmp_path / "test_image.png"
+        source_image.write_bytes(sample_png)
+        image_size = len(sample_png)
+        doc_id = uuid.uuid4()
+
+        await storage_manager.store_images(doc_id, [source_image])
+        stats = storage_manager.get_storage_stats()
+        assert stats['total_files'] == 1
+        assert stats['total_size_bytes'] == image_size
+
+        # A fresh manager picks up the persisted totals
+        reloaded = ImageStorageManager(storage_manager.settings).get_storage_stats()
+        assert reloaded['total_files'] == 1
+
+        await storage_manager.cleanup_document_images(doc_id)
+        stats = storage_manager.get_storage_stats()
+        assert stats['total_files'] == 0
+        assert stats['total_size_bytes'] == 0
+
+    def test_storage_stats_skip_scratch_files(self, storage_manager, sample_png):
+        """Test that in-progress extraction output is not counted."""
+        scratch_image = storage_manager.scratch_path / "doceater_images_1_x" / "img.png"
+        scratch_image.parent.mkdir(parents=True)
+        scratch_image.write_bytes(sample_png)
+
+        # A new manager rebuilds the totals from the tree
+        (storage_manager.base_path / '.stats.json').unlink()
+        stats = ImageStorageManager(storage_manager.settings).get_storage_stats()
+        assert stats['total_files'] == 0
+        assert stats['total_size_bytes'] == 0
+
+    def test_storage_stats_seed_counts_only_stored_images(self, storage_manager):
+        """Test rebuilding the totals walks only date and document directories."""
+        base = storage_manager.base_path
+        stored = [
+            base / "2025" / "01" / "19" / str(uuid.uuid4()) / "a.png",
+            base / str(uuid.uuid4()) / "b.png",
+        ]
+        ignored = [
+            base / "doceater_images_1_x" / "doc" / "c.png",
+            base / ".stats.tmp",
+            base / "notes.txt",
+        ]
+        for path in stored + ignored:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"12345")
+
+        (base / '.stats.json').unlink()
+        stats = ImageStorageManager(storage_manager.settings).get_storage_stats()
+        assert stats['total_files'] == 2
+        assert stats['total_size_bytes'] == 10
+
+    def test_storage_stats_concurrent_updates(self, storage_manager):
+        """Test that updates from several threads are all counted and persisted."""
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(200):
+                executor.submit(storage_manager._adjust_stats, 1, 10)
+
+        stats = storage_manager.get_storage_stats()
+        assert stats['total_files'] == 200
+        assert stats['total_size_bytes'] == 2000
+
+        reloaded = ImageStorageManager(storage_manager.settings).get_storage_stats()
+        assert reloaded['total_files'] == 200
+
 
 class TestStoredImage:
     """Test cases for StoredImage class."""
@@ -66,6 +66,7 @@ class TestDocument:
         assert "file_path" in columns
         assert "filename" in columns
         assert "content_hash" in columns
+        assert "content_hash_algo" in columns
         assert "file_size" in columns
         assert "mime_type" in columns
         assert "markdown_content" in columns
@@ -78,28 +79,22 @@ class TestDocument:
         doc_id = uuid.uuid4()
         now = datetime.now()
 
-        doc = Document()
-        doc.id = doc_id
-        doc.file_path = "/test/path/document.pdf"
-        doc.filename = "document.pdf"
-        doc.content_hash = "abc123"
-        doc.file_size = 1024
-        doc.mime_type = "application/pdf"
-        doc.markdown_content = "# Test Document"
-        doc.status = DocumentStatus.COMPLETED
-        doc.created_at = now
-        doc.updated_at = now
-
-        assert doc.id == doc_id
-        assert doc.file_path == "/test/path/document.pdf"
-        assert doc.filename == "document.pdf"
-        assert doc.content_hash == "abc123"
-        assert doc.file_size == 1024
-        assert doc.mime_type == "application/pdf"
-        assert doc.markdown_content == "# Test Document"
-        assert doc.status == DocumentStatus.COMPLETED
-        assert doc.created_at == now
-        assert doc.updated_at == now
+        expected = {
+            "id": doc_id,
+            "file_path": "/test/path/document.pdf",
+            "filename": "document.pdf",
+            "content_hash": "abc123",
+            "file_size": 1024,
+            "mime_type": "application/pdf",
+            "markdown_content": "# Test Document",
+            "status": DocumentStatus.COMPLETED,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+        doc = Document(**expected)
+
+        assert {key: getattr(doc, key) for key in expected} == expected
 
     def test_document_repr(self):
         """Test Document string representation."""
@@ -131,18 +126,17 @@ class TestDocumentMetadata:
         metadata_id = uuid.uuid4()
         now = datetime.now()
 
-        metadata = DocumentMetadata()
-        metadata.id = metadata_id
-        metadata.document_id = doc_id
-        metadata.key = "author"
-        metadata.value = "John Doe"
-        metadata.created_at = now
+        expected = {
+            "id": metadata_id,
+            "document_id": doc_id,
+            "key": "author",
+            "value": "John Doe",
+            "created_at": now,
+        }
 
-        assert metadata.id == metadata_id
-        assert metadata.document_id == doc_id
-        assert metadata.key == "author"
-        assert metadata.value == "John Doe"
-        assert metadata.created_at == now
+        metadata = DocumentMetadata(**expected)
+
+        assert {key: getattr(metadata, key) for key in expected} == expected
 
     def test_metadata_null_value(self):
         """Test DocumentMetadata with null value."""
@@ -191,20 +185,18 @@ class TestProcessingLog:
         log_id = uuid.uuid4()
         now = datetime.now()
 
-        log = ProcessingLog()
-        log.id = log_id
-        log.document_id = doc_id
-        log.level = LogLevel.INFO
-        log.message = "Processing started"
-        log.details = {"file_size": 1024}
-        log.created_at = now
-
-        assert log.id == log_id
-        assert log.document_id == doc_id
-        assert log.level == LogLevel.INFO
-        assert log.message == "Processing started"
-        assert log.details == {"file_size": 1024}
-        assert log.created_at == now
+        expected = {
+            "id": log_id,
+            "document_id": doc_id,
+            "level": LogLevel.INFO,
+            "message": "Processing started",
+            "details": {"file_size": 1024},
+            "created_at": now,
+        }
+
+        log = ProcessingLog(**expected)
+
+        assert {key: getattr(log, key) for key in expected} == expected
 
     def test_log_system_message(self):
         """Test ProcessingLog for system messages (no document_id)."""
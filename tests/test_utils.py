@@ -2,30 +2,97 @@
 
 from __future__ import annotations
 
+import functools
 import hashlib
+import os
 from pathlib import Path
 from typing import Any
 
+__all__ = [
+    "EXCLUDE_PATTERNS",
+    "SAMPLE_MARKDOWN",
+    "SAMPLE_METADATA",
+    "SUPPORTED_EXTENSIONS",
+    "UNSUPPORTED_EXTENSIONS",
+    "MockAsyncContextManager",
+    "assert_file_content",
+    "assert_file_exists",
+    "assert_file_not_exists",
+    "assert_file_size",
+    "calculate_content_hash",
+    "create_temp_file",
+    "create_test_pdf",
+    "create_test_text_file",
+]
+
 
 def create_test_text_file(content: str = "Test content") -> str:
     """Create test text content."""
     return content
 
 
+# Fixed leading objects of a one-page PDF; only the content stream varies
+_PDF_HEADER = b"%PDF-1.4\n"
+_PDF_OBJECTS = (
+    b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n",
+    b"2 0 obj\n<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n",
+    b"3 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+    b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>\nendobj\n",
+    b"5 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\nendobj\n",
+)
+_PDF_PREFIX = _PDF_HEADER + b"".join(_PDF_OBJECTS)
+_PDF_OFFSETS = tuple(
+    len(_PDF_HEADER) + sum(len(obj) for obj in _PDF_OBJECTS[:i])
+    for i in range(len(_PDF_OBJECTS))
+)
+
+
+@functools.lru_cache(maxsize=32)
+def create_test_pdf(content: str = "Test content") -> bytes:
+    """Build a minimal one-page PDF showing ``content``."""
+    text = content.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("latin-1") + b") Tj ET"
+    contents = b"4 0 obj\n<< /Length %d >>\nstream\n%s\nendstream\nendobj\n" % (
+        len(stream),
+        stream,
+    )
+
+    # The content stream is object 4 but sits after the fixed objects
+    first, second, third, font = _PDF_OFFSETS
+    offsets = (first, second, third, len(_PDF_PREFIX), font)
+    xref = b"xref\n0 6\n0000000000 65535 f \n" + b"".join(
+        b"%010d 00000 n \n" % offset for offset in offsets
+    )
+    trailer = b"trailer\n<< /Size 6 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(_PDF_PREFIX) + len(contents)
+    )
+    return _PDF_PREFIX + contents + xref + trailer
+
+
 def calculate_content_hash(content: bytes | str) -> str:
     """Calculate SHA-256 hash of content."""
     if isinstance(content, str):
         content = content.encode("utf-8")
-    return hashlib.sha256(content).hexdigest()
+    hasher = hashlib.sha256()
+    hasher.update(content)
+    return hasher.hexdigest()
 
 
 def create_temp_file(directory: Path, filename: str, content: bytes | str) -> Path:
     """Create a temporary file with given content."""
     file_path = directory / filename
     if isinstance(content, str):
-        file_path.write_text(content, encoding="utf-8")
-    else:
-        file_path.write_bytes(content)
+        content = content.encode("utf-8")
+
+    # Write unbuffered straight to the descriptor; large fixtures skip
+    # Python's buffer copy
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(content)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
     return file_path
 
 
@@ -54,15 +121,19 @@ def assert_file_not_exists(file_path: Path) -> None:
 
 def assert_file_content(file_path: Path, expected_content: str) -> None:
     """Assert that a file contains expected content."""
-    assert_file_exists(file_path)
-    actual_content = file_path.read_text(encoding="utf-8")
+    try:
+        actual_content = file_path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        raise AssertionError(f"File does not exist: {file_path}") from None
     assert actual_content == expected_content, f"File content mismatch in {file_path}"
 
 
 def assert_file_size(file_path: Path, expected_size: int) -> None:
     """Assert that a file has expected size."""
-    assert_file_exists(file_path)
-    actual_size = file_path.stat().st_size
+    try:
+        actual_size = os.stat(file_path).st_size
+    except FileNotFoundError:
+        raise AssertionError(f"File does not exist: {file_path}") from None
     assert actual_size == expected_size, (
         f"File size mismatch: expected {expected_size}, got {actual_size}"
     )
@@ -0,0 +1,471 @@
+"""Tests for the file system watcher."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock
+
+import pytest
+from watchdog.events import (
+    DirCreatedEvent,
+    FileCreatedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+)
+
+from doceater import watcher as watcher_module
+from doceater.watcher import FileEventHandler, FileWatcher, _scan_files
+
+if TYPE_CHECKING:
+    from doceater.config import Settings
+
+
+class FakeClock:
+    """Clock that only moves when a test advances it."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> float:
+        self.now += seconds
+        return self.now
+
+
+class FakeProcessor:
+    """Processor stand-in that records files and can hold them in flight."""
+
+    def __init__(self) -> None:
+        self.calls: list[Path] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def process_file(self, file_path: Path) -> bool:
+        self.calls.append(file_path)
+        await self.release.wait()
+        return True
+
+    def cleanup_temp_images(self) -> None:
+        pass
+
+
+def _drain(queue: asyncio.Queue[Path]) -> list[Path]:
+    """Take everything currently on a queue."""
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+class TestFileEventHandler:
+    """Test event debouncing in FileEventHandler."""
+
+    @pytest.fixture
+    def settings(self, test_settings: Settings) -> Settings:
+        """Use a one second quiet window and a five second cap."""
+        return test_settings.model_copy(
+            update={"processing_delay_seconds": 1.0, "max_debounce_seconds": 5.0}
+        )
+
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    @pytest.fixture
+    def handler(self, settings: Settings, clock: FakeClock) -> FileEventHandler:
+        return FileEventHandler(MagicMock(), settings, clock=clock)
+
+    @pytest.fixture
+    def doc(self, temp_dir: Path) -> Path:
+        return temp_dir / "doc.pdf"
+
+    def test_slow_write_is_emitted_once_after_it_settles(self, handler, clock, doc):
+        """Test a file is not emitted while it is still being written."""
+        # Write for three seconds, one chunk every 100 ms
+        with doc.open("wb") as f:
+            for _ in range(30):
+                f.write(b"x" * 100)
+                f.flush()
+                handler._queue_file_for_processing(str(doc))
+                handler._flush(clock.advance(0.1))
+                assert handler.processing_queue.empty()
+
+        # Emitted once the quiet window after the last write has passed
+        handler._flush(clock.advance(0.5))
+        assert handler.processing_queue.empty()
+        handler._flush(clock.advance(0.5))
+        assert _drain(handler.processing_queue) == [doc]
+
+        # The window is closed, so nothing is emitted again
+        handler._flush(clock.advance(10))
+        assert handler.processing_queue.empty()
+
+    def test_repeated_events_are_coalesced(self, handler, clock, doc):
+        """Test repeated events for an unchanged file emit it once."""
+        doc.write_bytes(b"content")
+        for _ in range(5):
+            handler._queue_file_for_processing(str(doc))
+
+        handler._flush(clock.advance(1.0))
+        assert _drain(handler.processing_queue) == [doc]
+
+        # Events after the emit without a change do not reopen the window
+        handler._queue_file_for_processing(str(doc))
+        handler._flush(clock.advance(1.0))
+        assert handler.processing_queue.empty()
+
+    def test_change_without_event_extends_window(self, handler, clock, doc):
+        """Test a change seen only at the deadline holds the file back."""
+        doc.write_bytes(b"first")
+        handler._queue_file_for_processing(str(doc))
+
+        doc.write_bytes(b"first and second")
+        handler._flush(clock.advance(1.0))
+        assert handler.processing_queue.empty()
+
+        handler._flush(clock.advance(1.0))
+        assert _drain(handler.processing_queue) == [doc]
+
+    def test_file_that_never_settles_is_emitted_at_cap(self, handler, clock, doc):
+        """Test max_debounce_seconds bounds how long a file is held back."""
+        emitted_at = []
+        for step in range(1, 61):
+            doc.write_bytes(b"x" * step)
+            handler._queue_file_for_processing(str(doc))
+            handler._flush(clock.advance(0.25))
+            if _drain(handler.processing_queue):
+                emitted_at.append(clock.now)
+
+        assert emitted_at == [5.0, 10.0, 15.0]
+
+    def test_deleted_file_is_dropped(self, handler, clock, doc):
+        """Test a file removed before it settles is never emitted."""
+        doc.write_bytes(b"content")
+        handler._queue_file_for_processing(str(doc))
+        doc.unlink()
+
+        handler._flush(clock.advance(1.0))
+        assert handler.processing_queue.empty()
+        assert not handler._first_seen
+
+    def test_full_queue_retries_later(self, handler, clock, temp_dir):
+        """Test a file that does not fit on the queue is emitted later."""
+        files = [temp_dir / f"doc{i}.pdf" for i in range(9)]
+        for file_path in files:
+            file_path.write_bytes(b"content")
+            handler._queue_file_for_processing(str(file_path))
+
+        # The test settings allow two concurrent files, so eight fit
+        handler._flush(clock.advance(1.0))
+        assert len(_drain(handler.processing_queue)) == 8
+
+        handler._flush(clock.advance(1.0))
+        assert _drain(handler.processing_queue) == [files[-1]]
+
+    @pytest.mark.asyncio
+    async def test_dispatch_filters_and_coalesces_events(self, handler):
+        """Test events are filtered by name and only one waits per file."""
+        handler._loop = asyncio.get_running_loop()
+        handler._queue_file_for_processing = MagicMock()
+
+        handler.on_created(FileCreatedEvent("/watch/doc.pdf"))
+        handler.on_modified(FileModifiedEvent("/watch/doc.pdf"))
+        handler.on_moved(FileMovedEvent("/watch/draft", "/watch/notes.TXT"))
+        handler.on_created(DirCreatedEvent("/watch/dir.pdf"))
+        handler.on_created(FileCreatedEvent("/watch/sheet.xlsx"))
+        handler.on_created(FileCreatedEvent("/watch/.hidden.pdf"))
+        handler.on_created(FileCreatedEvent("/watch/~lock.pdf"))
+        assert handler._in_flight == {"/watch/doc.pdf", "/watch/notes.TXT"}
+
+        await asyncio.sleep(0)
+        handled = [c.args[0] for c in handler._queue_file_for_processing.call_args_list]
+        assert handled == ["/watch/doc.pdf", "/watch/notes.TXT"]
+
+    def test_dispatch_before_loop_starts_is_ignored(self, handler):
+        """Test events arriving before the debounce loop runs are dropped."""
+        handler.on_created(FileCreatedEvent("/watch/doc.pdf"))
+        assert not handler._in_flight
+
+    def test_stat_cache_evicts_least_recently_seen(self, handler, monkeypatch):
+        """Test the stat signature cache stays bounded."""
+        monkeypatch.setattr(watcher_module, "_STAT_CACHE_SIZE", 2)
+
+        assert handler._record_signature("a", (1, 1))
+        assert handler._record_signature("b", (1, 1))
+        assert not handler._record_signature("a", (1, 1))
+        assert handler._record_signature("c", (1, 1))
+
+        # "b" was seen least recently, so it is forgotten first
+        assert list(handler._stat_cache) == ["a", "c"]
+        assert handler._record_signature("b", (1, 1))
+        assert handler._record_signature("a", (2, 1))
+
+    @pytest.mark.asyncio
+    async def test_debounce_loop_emits_after_quiet_window(
+        self, test_settings, temp_dir
+    ):
+        """Test the running loop picks up dispatched events."""
+        handler = FileEventHandler(MagicMock(), test_settings)
+        doc = temp_dir / "doc.pdf"
+        doc.write_bytes(b"content")
+
+        task = asyncio.create_task(handler.debounce_loop())
+        try:
+            await asyncio.sleep(0)
+            handler._dispatch(str(doc))
+            queued = await asyncio.wait_for(handler.processing_queue.get(), 2)
+            assert queued == doc
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+class TestScanFiles:
+    """Test the existing-file scan."""
+
+    @pytest.fixture
+    def tree(self, temp_dir: Path) -> Path:
+        for name in [
+            "a.pdf",
+            "b.TXT",
+            "c.docx",
+            ".hidden.pdf",
+            "sub/d.pdf",
+            "sub/deeper/e.txt",
+            "sub/~f.pdf",
+        ]:
+            path = temp_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"content")
+        return temp_dir
+
+    def test_scan_recursive(self, tree, test_settings):
+        """Test a recursive scan finds supported files in all directories."""
+        found = _scan_files(
+            tree, test_settings.extensions_set, test_settings.excluded_re, True
+        )
+        assert sorted(p.relative_to(tree).as_posix() for p in found) == [
+            "a.pdf",
+            "b.TXT",
+            "sub/d.pdf",
+            "sub/deeper/e.txt",
+        ]
+
+    def test_scan_top_level_only(self, tree, test_settings):
+        """Test a non-recursive scan stays in the root directory."""
+        found = _scan_files(
+            tree, test_settings.extensions_set, test_settings.excluded_re, False
+        )
+        assert sorted(p.name for p in found) == ["a.pdf", "b.TXT"]
+
+    def test_scan_skips_unreadable_directory(self, temp_dir, test_settings):
+        """Test a directory that cannot be listed is skipped."""
+        found = _scan_files(
+            temp_dir / "missing",
+            test_settings.extensions_set,
+            test_settings.excluded_re,
+            True,
+        )
+        assert found == []
+
+
+class TestFileWatcher:
+    """Test queue consumption in FileWatcher."""
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_limits_start_rate(self, test_settings):
+        """Test files beyond the burst wait for the bucket to refill."""
+        clock = FakeClock()
+        settings = test_settings.model_copy(
+            update={"processing_rate_per_sec": 100.0, "processing_burst": 2}
+        )
+        watcher = FileWatcher(settings, processor=FakeProcessor(), clock=clock)
+
+        # The full burst is available at once
+        await asyncio.wait_for(watcher._take_token(), 1)
+        await asyncio.wait_for(watcher._take_token(), 1)
+
+        # The bucket is empty and the clock stands still
+        waiter = asyncio.create_task(watcher._take_token())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+
+        # One token refills after 1 / rate seconds
+        clock.advance(0.01)
+        await asyncio.wait_for(waiter, 1)
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_disabled_without_rate(self, test_settings):
+        """Test a zero rate never waits."""
+        watcher = FileWatcher(
+            test_settings, processor=FakeProcessor(), clock=FakeClock()
+        )
+        for _ in range(test_settings.processing_burst * 3):
+            await asyncio.wait_for(watcher._take_token(), 1)
+
+    @pytest.mark.asyncio
+    async def test_admission_caps_concurrent_files(self, test_settings, temp_dir):
+        """Test no more than max_concurrent_files are processed at once."""
+        processor = FakeProcessor()
+        processor.release.clear()
+        watcher = FileWatcher(test_settings, processor=processor)
+        queue = watcher.event_handler.processing_queue
+
+        consumer = asyncio.create_task(watcher._process_queue())
+        try:
+            for i in range(4):
+                await queue.put(temp_dir / f"doc{i}.pdf")
+            await asyncio.sleep(0.05)
+            assert len(processor.calls) == test_settings.max_concurrent_files
+
+            processor.release.set()
+            await asyncio.wait_for(queue.join(), 2)
+            assert len(processor.calls) == 4
+            assert watcher._active == 0
+            assert not watcher._active_paths
+        finally:
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_process_existing_files(self, test_settings, temp_dir):
+        """Test existing files are fed through the queue and all processed."""
+        processor = FakeProcessor()
+        watcher = FileWatcher(test_settings, processor=processor)
+        files = [temp_dir / f"doc{i}.pdf" for i in range(5)]
+        for file_path in files:
+            file_path.write_bytes(b"content")
+        (temp_dir / "skip.docx").write_bytes(b"content")
+
+        await asyncio.wait_for(watcher.process_existing_files(), 5)
+
+        assert sorted(processor.calls) == files
+        assert watcher._processed_count == 5
+        assert watcher.event_handler.processing_queue.empty()
+        assert not [
+            task
+            for task in asyncio.all_tasks()
+            if task.get_name() == "doceater.existing_consumer"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_failed_files_are_counted(self, test_settings, temp_dir):
+        """Test a processor error counts the file as failed."""
+        processor = FakeProcessor()
+        processor.process_file = MagicMock(side_effect=RuntimeError("boom"))
+        watcher = FileWatcher(test_settings, processor=processor)
+
+        await watcher._process_file_safe(temp_dir / "doc.pdf")
+
+        assert watcher._processed_count == 1
+        assert watcher._failed_count == 1
+
+    @pytest.mark.asyncio
+    async def test_watching_processes_new_files(self, test_settings, temp_dir):
+        """Test a file written into the watched folder is processed."""
+        processor = FakeProcessor()
+        watcher = FileWatcher(test_settings, processor=processor)
+
+        await watcher.start_watching()
+        try:
+            doc = temp_dir / "new.pdf"
+            doc.write_bytes(b"content")
+            for _ in range(200):
+                if processor.calls:
+                    break
+                await asyncio.sleep(0.01)
+            assert processor.calls == [doc]
+        finally:
+            await watcher.stop_watching()
+
+        assert watcher.observer is None
+        assert watcher._consumer_task is None
+        assert watcher._debounce_task is None
+
+    @pytest.mark.asyncio
+    async def test_file_already_processing_is_not_started_twice(
+        self, test_settings, temp_dir
+    ):
+        """Test a repeat emit does not race the pass already running."""
+        processor = FakeProcessor()
+        processor.release.clear()
+        watcher = FileWatcher(test_settings, processor=processor)
+        queue = watcher.event_handler.processing_queue
+        doc = temp_dir / "doc.pdf"
+
+        consumer = asyncio.create_task(watcher._process_queue())
+        try:
+            await queue.put(doc)
+            await queue.put(doc)
+            await asyncio.sleep(0.05)
+            assert processor.calls == [doc]
+
+            processor.release.set()
+            await asyncio.wait_for(queue.join(), 2)
+            assert processor.calls == [doc]
+        finally:
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_backfill_stops_its_consumer(self, test_settings, temp_dir):
+        """Test cancelling process_existing_files leaves no consumer running."""
+        processor = FakeProcessor()
+        processor.release.clear()
+        watcher = FileWatcher(test_settings, processor=processor)
+        for i in range(3):
+            (temp_dir / f"doc{i}.pdf").write_bytes(b"content")
+
+        backfill = asyncio.create_task(watcher.process_existing_files())
+        while not processor.calls:
+            await asyncio.sleep(0.01)
+        backfill.cancel()
+        await asyncio.gather(backfill, return_exceptions=True)
+
+        assert backfill.cancelled()
+        assert not [
+            task
+            for task in asyncio.all_tasks()
+            if task.get_name() == "doceater.existing_consumer"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_update_settings_resizes_admission(self, test_settings):
+        """Test raising max_concurrent_files admits a waiting file at once."""
+        settings = test_settings.model_copy(update={"max_concurrent_files": 1})
+        watcher = FileWatcher(settings, processor=FakeProcessor())
+
+        await watcher._acquire_slot()
+        waiter = asyncio.create_task(watcher._acquire_slot())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        new_settings = settings.model_copy(update={"max_concurrent_files": 2})
+        await watcher.update_settings(new_settings)
+        await asyncio.wait_for(waiter, 1)
+
+        assert watcher._active == 2
+        assert watcher.settings is new_settings
+        assert watcher.event_handler.settings is new_settings
+
+    @pytest.mark.asyncio
+    async def test_update_settings_lowers_admission(self, test_settings):
+        """Test lowering max_concurrent_files holds new files until slots free."""
+        watcher = FileWatcher(test_settings, processor=FakeProcessor())
+        await watcher._acquire_slot()
+
+        await watcher.update_settings(
+            test_settings.model_copy(update={"max_concurrent_files": 1})
+        )
+        waiter = asyncio.create_task(watcher._acquire_slot())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        # Finishing the running file frees the only slot
+        await watcher._process_in_slot(Path("done.pdf"))
+        await asyncio.wait_for(waiter, 1)
+        assert watcher._active == 1